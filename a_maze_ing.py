@@ -6,14 +6,27 @@ from mazegen.display.tty import BackendException
 from mazegen.maze import (
     Maze,
     Pattern,
+    DirtyTracker,
     make_empty,
     NetworkTracker,
     PacmanTracker,
     make_pacman,
     make_perfect,
+    make_perfect_kruskal,
+    make_perfect_tiled,
+    LoadError,
+    load_output,
+    check_loaded,
 )
 from mazegen.config.config_parser import Config, ConfigError
-from mazegen.maze.output import format_output
+from mazegen.maze.output import (
+    write_output,
+    write_binary_output,
+    format_streamed_output,
+    format_streamed_binary_output,
+)
+from mazegen.maze.path import pathfind_bfs
+from mazegen.utils import CellCoord, GCPolicy, IVec2, WallCoord
 import random
 
 
@@ -23,11 +36,25 @@ def error(s: str) -> Never:
     exit(1)
 
 
+if len(argv) == 3 and argv[1] == "--check":
+    try:
+        loaded = load_output(argv[2])
+    except LoadError as e:
+        error(e.args[0] + "\n")
+    issues = check_loaded(loaded)
+    path = pathfind_bfs(loaded.maze)
+    if path is not None:
+        print("".join(map(str, path)))
+    if len(issues) != 0:
+        error("".join(f"{issue}\n" for issue in issues))
+    exit(0)
+
 if len(argv) != 2:
     error(
         "  Invalid argument count, usage:\n"
         + "\n"
         + "    > python a_maze_ing.py <filename>\n"
+        + "    > python a_maze_ing.py --check <output file>\n"
         + "\n"
     )
 
@@ -45,15 +72,48 @@ except ParseError as e:
 except ConfigError as e:
     error(e.args[0] + "\n")
 
-if config.seed is not None:
-    random.seed(config.seed)
+rng = random.Random(config.seed)
+
+if config.algorithm == "ELLER":
+    dims = IVec2(config.width, config.height)
+    entry = CellCoord(config.entry or IVec2.splat(0))
+    exit_ = CellCoord(config.exit or IVec2.splat(0))
+    pattern = Pattern(config.maze_pattern).centered_for(dims, {entry, exit_})
+    try:
+        if config.output_format == "BINARY":
+            with open(config.output_file, "wb") as bf:
+                bf.writelines(
+                    format_streamed_binary_output(
+                        dims, entry, exit_, pattern, rng, config.seed
+                    )
+                )
+        else:
+            with open(config.output_file, "w") as f:
+                f.writelines(
+                    format_streamed_output(dims, entry, exit_, pattern, rng)
+                )
+    except IOError:
+        error(f"Failed to write to file {config.output_file}\n")
+    exit(0)
 
 maze = Maze(config)
+gc_policy = GCPolicy(record=config.visual or config.gc_report)
 
 pacman_tracker = PacmanTracker(maze)
-network_tracker = NetworkTracker(maze)
+network_tracker = (
+    NetworkTracker(maze) if config.algorithm == "CONTOUR" else None
+)
+# The walls changed since the last pass of make_perfect, such that the
+# screensaver only goes through those
+dirty_tracker = (
+    DirtyTracker(maze)
+    if network_tracker is not None and config.screensaver
+    else None
+)
 try:
-    tty_tracker = TTYTracker(maze, config) if config.visual else None
+    tty_tracker = (
+        TTYTracker(maze, config, gc_policy) if config.visual else None
+    )
 except BackendException as e:
     error(e.args[0] + "\n")
 
@@ -62,42 +122,84 @@ excluded = {maze.entry, maze.exit}
 pattern = Pattern(config.maze_pattern).centered_for(maze.dims, excluded)
 
 
+def maze_perfect(incremental: bool = False) -> None:
+    with gc_policy.bulk():
+        if network_tracker is not None:
+            dirty = (
+                dirty_tracker.clear()
+                if incremental and dirty_tracker is not None
+                else None
+            )
+            make_perfect(maze, network_tracker, rng, dirty)
+            if dirty_tracker is not None:
+                dirty_tracker.clear()
+        elif config.algorithm == "TILED":
+            make_perfect_tiled(maze, rng)
+        else:
+            make_perfect_kruskal(maze, rng)
+
+
+def maze_pacman(walls_const: set[WallCoord]) -> None:
+    with gc_policy.bulk():
+        make_pacman(maze, walls_const, pacman_tracker, rng=rng)
+
+
 def maze_main() -> None:
     pattern.write_to_maze(maze)
     maze.outline()
 
     walls_const = set(maze.walls_full())
 
-    make_perfect(maze, network_tracker)
+    maze_perfect()
     if not config.perfect:
-        make_pacman(maze, walls_const, pacman_tracker)
+        maze_pacman(walls_const)
+    # The trackers are only filled in by the first generation
+    if config.visual or config.screensaver:
+        gc_policy.freeze()
 
     while config.screensaver:
-        make_perfect(maze, network_tracker)
-        make_pacman(maze, walls_const, pacman_tracker)
+        maze_perfect(incremental=True)
+        maze_pacman(walls_const)
 
 
-if config.visual:
-    while True:
-        try:
-            if tty_tracker is not None:
-                tty_tracker.update = False
-                make_empty(maze, set())
-                tty_tracker.update = True
+def maze_output() -> None:
+    try:
+        if config.output_format == "BINARY":
+            with open(config.output_file, "wb") as bf:
+                write_binary_output(maze, bf, config.seed, config.algorithm)
+        else:
+            with open(config.output_file, "w") as f:
+                write_output(maze, f)
+    except IOError:
+        if tty_tracker is not None:
+            tty_tracker.uninit()
+        error(f"Failed to write to file {config.output_file}\n")
 
-            maze_main()
 
-            try:
-                with open(config.output_file, "w") as f:
-                    f.write(format_output(maze))
-            except IOError:
+try:
+    if config.visual:
+        try:
+            while True:
+                try:
+                    if tty_tracker is not None:
+                        tty_tracker.update = False
+                        make_empty(maze, set())
+                        tty_tracker.update = True
+
+                    maze_main()
+                    maze_output()
+
+                    while tty_tracker is not None:
+                        tty_tracker.display_maze(wait_for_tick=True)
+                except MazeRegenerate:
+                    continue
+        finally:
+            if config.gc_report:
                 if tty_tracker is not None:
                     tty_tracker.uninit()
-                error(f"Failed to write to file {config.output_file}\n")
-
-            while tty_tracker is not None:
-                tty_tracker.display_maze(wait_for_tick=True)
-        except MazeRegenerate:
-            continue
-else:
-    maze_main()
+                print(gc_policy.report(), end="", file=stderr)
+    else:
+        maze_main()
+        maze_output()
+finally:
+    gc_policy.close()
@@ -1,11 +1,38 @@
 __version__ = "1.0.0"
 __author__ = "luflores & agilliar"
 
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from random import Random
+from typing import TYPE_CHECKING, BinaryIO, Literal, TextIO, overload
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+    from mazegen.maze.maze import WallPlanes
+
+
+@dataclass(frozen=True)
+class MazeSpec:
+    """
+    The options of a single maze to generate, as taken by MazeGenerator
+    """
+
+    dims: tuple[int, int]
+    entry: tuple[int, int]
+    exit: tuple[int, int]
+    perfect: bool = True
+    seed: int | None = None
+    algorithm: str = "CONTOUR"
+
 
 class MazeGenerator:
     """
     A very simple but not very practical maze generator
-    The options have the same effect as in the config file
+    The options have the same effect as in the config file, every random
+    choice being drawn from rng, by default a generator seeded with seed
     """
 
     def __init__(
@@ -15,20 +42,22 @@ class MazeGenerator:
         exit: tuple[int, int],
         perfect: bool = True,
         seed: int | None = None,
+        algorithm: str = "CONTOUR",
+        rng: Random | None = None,
     ) -> None:
         from mazegen.maze import (
             Maze,
             Pattern,
             make_perfect,
+            make_perfect_kruskal,
+            make_perfect_tiled,
             make_pacman,
             NetworkTracker,
             PacmanTracker,
         )
         from mazegen.utils import IVec2
-        import random
 
-        prev_rand = random.getstate()
-        random.seed(seed)
+        rng = rng if rng is not None else Random(seed)
 
         maze = Maze(IVec2(*dims), IVec2(*entry), IVec2(*exit))
         maze.outline()
@@ -37,20 +66,129 @@ class MazeGenerator:
         ).write_to_maze(maze)
         walls_const = set(maze.walls_full())
 
-        make_perfect(maze, NetworkTracker(maze))
+        trackers: list[NetworkTracker | PacmanTracker] = []
+        if algorithm == "KRUSKAL":
+            make_perfect_kruskal(maze, rng)
+        elif algorithm == "TILED":
+            make_perfect_tiled(maze, rng)
+        else:
+            network_tracker = NetworkTracker(maze)
+            trackers.append(network_tracker)
+            make_perfect(maze, network_tracker, rng)
         if not perfect:
-            make_pacman(maze, walls_const, PacmanTracker(maze))
+            pacman_tracker = PacmanTracker(maze)
+            trackers.append(pacman_tracker)
+            make_pacman(maze, walls_const, pacman_tracker, rng=rng)
 
-        random.setstate(prev_rand)
+        for tracker in trackers:
+            tracker.end()
         self.__maze = maze
+        self.__seed = seed
+        self.__engine = algorithm
+
+    @staticmethod
+    def from_spec(spec: MazeSpec) -> "MazeGenerator":
+        """
+        Generates the maze described by spec
+        """
+        return MazeGenerator(
+            spec.dims,
+            spec.entry,
+            spec.exit,
+            spec.perfect,
+            spec.seed,
+            spec.algorithm,
+        )
+
+    @staticmethod
+    def generate_many(
+        specs: Iterable[MazeSpec], workers: int | None = None
+    ) -> Iterator[tuple[int, "MazeGenerator"]]:
+        """
+        Generates the mazes described by specs over a pool of worker
+        processes, as many as cpus by default
+        Yields each maze with the index of its spec as soon as it is done,
+        seeded mazes being the same as if generated one by one
+        """
+        with ProcessPoolExecutor(workers) as executor:
+            futures = {
+                executor.submit(MazeGenerator.from_spec, spec): idx
+                for idx, spec in enumerate(specs)
+            }
+            for future in as_completed(futures):
+                yield (futures[future], future.result())
+
+    @overload
+    def to_numpy(self, cells: Literal[False] = False) -> "WallPlanes": ...
+
+    @overload
+    def to_numpy(self, cells: Literal[True]) -> "NDArray[np.uint8]": ...
+
+    def to_numpy(
+        self, cells: bool = False
+    ) -> "WallPlanes | NDArray[np.uint8]":
+        """
+        Returns the walls as NumPy arrays, see Maze.to_numpy
+        """
+        if cells:
+            return self.__maze.to_numpy(True)
+        return self.__maze.to_numpy()
+
+    @staticmethod
+    def from_numpy(
+        walls: "WallPlanes | NDArray[np.uint8]",
+        entry: tuple[int, int] = (0, 0),
+        exit: tuple[int, int] = (0, 0),
+    ) -> "MazeGenerator":
+        """
+        Takes a maze from NumPy arrays instead of generating it, see
+        Maze.from_numpy, such that it may be written out
+        """
+        from mazegen.maze import Maze
+        from mazegen.utils import IVec2
+
+        res = MazeGenerator.__new__(MazeGenerator)
+        res.__maze = Maze.from_numpy(walls, IVec2(*entry), IVec2(*exit))
+        res.__seed = None
+        res.__engine = ""
+        return res
 
     def get_output(self) -> str:
         """
         Returns the output as formatted for the output file
         """
-        from mazegen.maze.output import format_output
+        from io import StringIO
+
+        res = StringIO()
+        self.write_output(res)
+        return res.getvalue()
+
+    def write_output(self, f: TextIO) -> None:
+        """
+        Writes the output as formatted for the output file to f, row by row
+        """
+        from mazegen.maze.output import write_output
+
+        write_output(self.__maze, f)
+
+    def get_binary_output(self) -> bytes:
+        """
+        Returns the output in the binary format, see OUTPUT_FORMAT
+        """
+        from io import BytesIO
+
+        res = BytesIO()
+        self.write_binary_output(res)
+        return res.getvalue()
+
+    def write_binary_output(self, f: BinaryIO) -> None:
+        """
+        Writes the output in the binary format to f, along with the seed and
+        algorithm the maze was generated with
+        """
+        from mazegen.maze.output import write_binary_output
 
-        return format_output(self.__maze)
+        write_binary_output(self.__maze, f, self.__seed, self.__engine)
 
 
-__all__ = ["MazeGenerator"]
+__all__ = ["MazeGenerator", "MazeSpec"]
@@ -322,6 +322,23 @@ class PathField(SimpleField[str]):
         return parse_path(s)
 
 
+def ChoiceField(choices: list[str]) -> Type[ConfigField[str]]:
+    """
+    A config field that parses one of the given identifiers
+    """
+
+    class Inner(SimpleField[str]):
+        def parse(self, s: str) -> ParseResult[str]:
+            return parser_map_err(
+                lambda e: ParseError(
+                    "Expected one of " + ", ".join(map(repr, choices)), e.at
+                ),
+                alt(*map(tag, choices)),
+            )(s)
+
+    return Inner
+
+
 def OptionalField[T, U](
     cls: Type[ConfigField[T, U]],
 ) -> Type[ConfigField[T, U | None]]:
@@ -545,10 +562,13 @@ class Config:
     entry: IVec2 | None
     exit: IVec2 | None
     output_file: str
+    output_format: str
     perfect: bool
     seed: int | None
+    algorithm: str
     screensaver: bool
     visual: bool
+    gc_report: bool
     tilemap_wall_size: IVec2
     tilemap_cell_size: IVec2
     tilemap_full: list[list[ColoredLine]]
@@ -581,10 +601,18 @@ class Config:
                     "ENTRY": OptionalField(CoordField),
                     "EXIT": OptionalField(CoordField),
                     "OUTPUT_FILE": PathField,
+                    "OUTPUT_FORMAT": DefaultedField(
+                        ChoiceField(["TEXT", "BINARY"]), "TEXT"
+                    ),
                     "PERFECT": DefaultedField(BoolField, True),
                     "SEED": OptionalField(IntField),
+                    "ALGORITHM": DefaultedField(
+                        ChoiceField(["CONTOUR", "KRUSKAL", "TILED", "ELLER"]),
+                        "CONTOUR",
+                    ),
                     "SCREENSAVER": DefaultedField(BoolField, False),
                     "VISUAL": DefaultedField(BoolField, False),
+                    "GC_REPORT": DefaultedField(BoolField, False),
                     "TILEMAP_WALL_SIZE": DefaultedField(
                         CoordField, IVec2(2, 1)
                     ),
@@ -689,5 +717,20 @@ class Config:
                 raise ConfigError(
                     f"The given exit {res.exit} is out of bounds of the maze"
                 )
+        if res.output_format == "BINARY" and res.seed is not None:
+            if not -(2**63) <= res.seed < 2**63:
+                raise ConfigError(
+                    "The BINARY output format holds seeds of at most 64 bits"
+                )
+        if res.algorithm == "ELLER":
+            if res.visual:
+                raise ConfigError(
+                    "The ELLER algorithm streams the maze to the output file "
+                    + "and cannot be used with the visualiser"
+                )
+            if not res.perfect:
+                raise ConfigError(
+                    "The ELLER algorithm can only make perfect mazes"
+                )
 
         return res
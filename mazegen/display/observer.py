@@ -3,7 +3,8 @@ from mazegen.config.config_parser import Config
 from mazegen.display.tty import TTYBackend, TileCycle
 from mazegen.maze.dirty_tracker import DirtyTracker
 from mazegen.maze.maze import Maze
-from mazegen.maze.path import pathfind_astar
+from mazegen.maze.path_tracker import PathTracker
+from mazegen.utils import GCPolicy
 from mazegen.utils.coords import Cardinal
 
 
@@ -19,16 +20,21 @@ class TTYTracker:
     This manages the different styles for use in interactively cycling them,
     manages the shortest path drawing, pause status, and redrawing only at
     specific intervals
+    Given a GC policy, its collections are run in the idle time before each
+    frame, and timed per frame
     """
 
     def __init__(
         self,
         maze: Maze,
         config: Config,
+        gc_policy: GCPolicy | None = None,
     ):
         self.__maze = maze
+        self.__gc_policy = gc_policy
         self.__frametime: float = 0.016
         self.__dirty_tracker = DirtyTracker(maze)
+        self.__path_tracker = PathTracker(maze)
         self.__backend = TTYBackend(config)
         tilemaps = self.__backend.tilemaps
         self.__filler_style = TileCycle(
@@ -56,7 +62,7 @@ class TTYTracker:
         self.__path: list[Cardinal] | None = None
         self.__draw_path: bool = True
 
-        maze.observers.add(lambda _: self.display_maze())
+        maze.batch_observers.add(lambda _: self.display_maze())
         self.__paused: bool = False
 
         self.update: bool = True
@@ -108,7 +114,7 @@ class TTYTracker:
             and self.__draw_path
         ):
             return None
-        path = pathfind_astar(self.__maze) if self.__draw_path else None
+        path = self.__path_tracker.path() if self.__draw_path else None
         empty = self.__empty_style.curr_style()
         self.redraw_path(empty, empty, empty)
         self.__path = path
@@ -171,10 +177,15 @@ class TTYTracker:
         now = time.monotonic()
         if self.__tick is not None:
             if wait_for_tick:
-                time.sleep(max(0.0, self.__frametime - now + self.__tick))
+                idle = self.__frametime - now + self.__tick
+                if self.__gc_policy is not None:
+                    idle -= self.__gc_policy.idle(idle)
+                time.sleep(max(0.0, idle))
             elif now - self.__tick < self.__frametime:
                 return
         self.__tick = time.monotonic()
+        if self.__gc_policy is not None:
+            self.__gc_policy.end_frame()
 
         if not self.update:
             self.__backend.present()
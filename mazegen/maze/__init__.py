@@ -1,21 +1,48 @@
 __author__ = "agilliar & luflores"
 
-from .maze import Maze
+from .wall_storage import WallStorage, ArrayWallStorage, DictWallStorage
+from .maze import Maze, MazeSnapshot
 from .pattern import Pattern
 from .dirty_tracker import DirtyTracker
 from .pacman_tracker import PacmanTracker
 from .network_tracker import NetworkTracker
+from .path_tracker import PathTracker
 from .make_empty import make_empty
 from .make_pacman import make_pacman
 from .make_perfect import make_perfect
+from .make_perfect_kruskal import make_perfect_kruskal
+from .make_perfect_tiled import make_perfect_tiled
+from .eller import eller_rows
+from .load_output import (
+    LoadError,
+    LoadedMaze,
+    BinaryOutput,
+    load_output,
+    open_binary_output,
+    check_loaded,
+)
 
 __all__ = [
+    "WallStorage",
+    "ArrayWallStorage",
+    "DictWallStorage",
     "Maze",
+    "MazeSnapshot",
     "Pattern",
     "DirtyTracker",
     "PacmanTracker",
     "NetworkTracker",
+    "PathTracker",
     "make_empty",
     "make_pacman",
     "make_perfect",
+    "make_perfect_kruskal",
+    "make_perfect_tiled",
+    "eller_rows",
+    "LoadError",
+    "LoadedMaze",
+    "BinaryOutput",
+    "load_output",
+    "open_binary_output",
+    "check_loaded",
 ]
@@ -10,13 +10,22 @@ class DirtyTracker:
     def __init__(self, maze: Maze) -> None:
         self.__maze: Maze = maze
         self.__dirty: set[WallCoord] = set()
-        maze.observers.add(self.__observer)
+        maze.batch_observers.add(self.__observer)
 
     def __repr__(self) -> str:
         return f"MazeDirtyTracker({self.__dirty})"
 
-    def __observer(self, wall: WallCoord) -> None:
-        self.__dirty ^= {wall}
+    def __observer(self, walls: list[WallCoord]) -> None:
+        self.__dirty ^= set(walls)
+
+    def fork(self, maze: Maze) -> "DirtyTracker":
+        """
+        Returns a tracker of the given fork of the tracked maze, see
+        Maze.fork, with the same dirty walls
+        """
+        res = DirtyTracker(maze)
+        res.__dirty = set(self.__dirty)
+        return res
 
     def clear(self) -> set[WallCoord]:
         """
@@ -37,4 +46,4 @@ class DirtyTracker:
         """
         Remove this tracker from the observers of the maze
         """
-        self.__maze.observers.discard(self.__observer)
+        self.__maze.batch_observers.discard(self.__observer)
@@ -0,0 +1,174 @@
+from collections.abc import Generator
+from mazegen.maze.hex_row import hex_row
+from mazegen.maze.pattern import Pattern
+from mazegen.utils import DisjointSet, IVec2, resolve_rng
+import random
+
+type RowWalls = tuple[bytearray, bytearray]
+
+
+def eller_rows(
+    dims: IVec2, pattern: Pattern, rng: random.Random | None = None
+) -> Generator[str]:
+    """
+    Yields the rows of a perfect maze one at a time, in the hex format of
+    the output file, see eller_walls
+    """
+    for north, east, south in eller_walls(dims, pattern, rng):
+        yield hex_row(north, east, south, b"\x01" + east[:-1])
+
+
+def eller_walls(
+    dims: IVec2, pattern: Pattern, rng: random.Random | None = None
+) -> Generator[tuple[bytearray, bytearray, bytearray]]:
+    """
+    Yields the rows of a perfect maze one at a time, as the north, east and
+    south walls of their cells, one byte per cell, zero or one, holding only
+    the state of the current row
+
+    Rows are made with Eller's algorithm: each cell of a row belongs to a
+    set of cells connected above it, adjacent sets are randomly merged, then
+    every set is carried over to the next row through at least one open
+    wall
+    The rows the pattern spans are instead made as a single band through
+    Kruskal's algorithm, starting one row above it such that every set
+    entering the band is merged, the pattern is expected not to touch the
+    outline, as placed by Pattern.centered_for
+    Every random choice is drawn from rng, the random module by default
+    """
+    rng = resolve_rng(rng)
+    width, height = dims.xy()
+    if width < 1 or height < 1:
+        return
+    blocked: dict[int, set[int]] = {}
+    for cell in pattern.cells():
+        blocked.setdefault(cell.y, set()).add(cell.x)
+    band_start, band_end = (
+        (max(min(blocked) - 1, 0), max(blocked))
+        if len(blocked) != 0
+        else (height, height)
+    )
+
+    sets = [-1] * width
+    north = bytearray([1]) * width
+    y = 0
+    while y < height:
+        if y == band_start:
+            rows, sets = eller_band(
+                width, height, band_start, band_end, sets, blocked, rng
+            )
+        else:
+            rows, sets = eller_row(width, height, y, sets, rng)
+        for east, south in rows:
+            yield (north, east, south)
+            north = south
+        y += len(rows)
+
+
+def eller_row(
+    width: int, height: int, y: int, sets: list[int], rng: random.Random
+) -> tuple[list[RowWalls], list[int]]:
+    """
+    Makes a single row through Eller's algorithm, from the sets carried over
+    from the row above, -1 meaning a cell not connected to it
+    Returns the east and south walls of the row, and the sets carried over
+    to the next one
+    """
+    cells = DisjointSet(2 * width)
+    labels = [
+        label if label != -1 else width + x for x, label in enumerate(sets)
+    ]
+    east = bytearray([1]) * width
+    last = y == height - 1
+    for x in range(width - 1):
+        if (last or rng.random() < 0.5) and cells.union(
+            labels[x], labels[x + 1]
+        ):
+            east[x] = 0
+    if last:
+        return ([(east, bytearray([1]) * width)], [-1] * width)
+    south, sets = carry_down(width, cells, labels, rng)
+    return ([(east, south)], sets)
+
+
+def eller_band(
+    width: int,
+    height: int,
+    start: int,
+    end: int,
+    sets: list[int],
+    blocked: dict[int, set[int]],
+    rng: random.Random,
+) -> tuple[list[RowWalls], list[int]]:
+    """
+    Makes the rows from start to end inclusive as a single band, through
+    Kruskal's algorithm over its open cells and the sets carried over from
+    the row above, the blocked cells keeping all their walls
+    Returns the east and south walls of each row, and the sets carried over
+    to the next one
+    """
+    size = (end - start + 1) * width
+    cells = DisjointSet(size + width)
+
+    def free(y: int, x: int) -> bool:
+        return x not in blocked.get(y, ())
+
+    for x, label in enumerate(sets):
+        if label != -1 and free(start, x):
+            cells.union(x, size + label)
+
+    edges: list[tuple[int, bool]] = []
+    for y in range(start, end + 1):
+        for x in range(width):
+            if not free(y, x):
+                continue
+            node = (y - start) * width + x
+            if x + 1 < width and free(y, x + 1):
+                edges.append((node, True))
+            if y < end and free(y + 1, x):
+                edges.append((node, False))
+    rng.shuffle(edges)
+
+    rows = [
+        (bytearray([1]) * width, bytearray([1]) * width)
+        for _ in range(start, end + 1)
+    ]
+    for node, is_east in edges:
+        if cells.union(node, node + 1 if is_east else node + width):
+            row, x = divmod(node, width)
+            rows[row][0 if is_east else 1][x] = 0
+
+    if end == height - 1:
+        return (rows, [-1] * width)
+    labels = [
+        (end - start) * width + x if free(end, x) else -1
+        for x in range(width)
+    ]
+    south, sets = carry_down(width, cells, labels, rng)
+    rows[-1] = (rows[-1][0], south)
+    return (rows, sets)
+
+
+def carry_down(
+    width: int, cells: DisjointSet, labels: list[int], rng: random.Random
+) -> tuple[bytearray, list[int]]:
+    """
+    Randomly opens the south walls of a row, at least once for every set of
+    cells, -1 labels being skipped
+    Returns the south walls, and the sets carried over to the next row,
+    renumbered from zero
+    """
+    members: dict[int, list[int]] = {}
+    for x, label in enumerate(labels):
+        if label != -1:
+            members.setdefault(cells.find(label), []).append(x)
+    south = bytearray([1]) * width
+    sets = [-1] * width
+    for renumbered, xs in enumerate(members.values()):
+        down = [x for x in xs if rng.random() < 0.5]
+        if len(down) == 0:
+            down = [rng.choice(xs)]
+        for x in down:
+            south[x] = 0
+            sets[x] = renumbered
+    return (south, sets)
@@ -0,0 +1,19 @@
+from collections.abc import Buffer
+
+HEX_TABLE = bytes.maketrans(bytes(range(16)), b"0123456789ABCDEF")
+
+
+def hex_row(north: Buffer, east: Buffer, south: Buffer, west: Buffer) -> str:
+    """
+    Formats a row of cells to hex from one byte per cell for each of its
+    walls, zero or one, all four being packed at once as big integers, each
+    byte of which then holds the value of its cell
+    """
+    packed = (
+        int.from_bytes(north)
+        | int.from_bytes(east) << 1
+        | int.from_bytes(south) << 2
+        | int.from_bytes(west) << 3
+    )
+    width = len(memoryview(north))
+    return packed.to_bytes(width).translate(HEX_TABLE).decode()
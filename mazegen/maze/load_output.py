@@ -0,0 +1,364 @@
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from mazegen.maze.hex_row import hex_row
+from mazegen.maze.maze import Maze
+from mazegen.maze.output import (
+    BINARY_HEADER,
+    BINARY_MAGIC,
+    BINARY_PATH,
+    BINARY_SEED,
+    BINARY_VERSION,
+    binary_strides,
+)
+from mazegen.maze.path import pathfind_bfs
+from mazegen.utils import Cardinal, CellCoord, IVec2
+import mmap
+import os
+import string
+
+HEX_DECODE = bytes(
+    int(chr(c), 16) if chr(c) in string.hexdigits else 0xFF
+    for c in range(256)
+)
+
+CARDINALS = {str(card): card for card in Cardinal.all()}
+
+BIT_DECODE = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class LoadError(Exception):
+    """
+    Raised when a file does not hold a maze in the output format
+    """
+
+
+@dataclass
+class LoadedMaze:
+    """
+    A maze read back from an output file, along with the path written with
+    it, None if the path line was missing or empty
+    """
+
+    maze: Maze
+    path: list[Cardinal] | None
+
+
+def load_output(filename: str) -> LoadedMaze:
+    """
+    Loads a maze from an output file, which is memory mapped rather than read
+    May raise a LoadError
+    """
+    try:
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise LoadError(f"The file {filename} is empty")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return parse_output(data)
+    except OSError:
+        raise LoadError(f"Failed to read file {filename}")
+
+
+def parse_output(data: bytes | mmap.mmap) -> LoadedMaze:
+    """
+    Parses a maze in the output format, decoding each row of hex cells at
+    once straight into the wall storage
+    The binary format is told apart by its magic, see BinaryOutput
+    May raise a LoadError
+    """
+    if data[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+        return BinaryOutput(data).loaded()
+    end = data.find(b"\n\n")
+    if end == -1:
+        raise LoadError("Missing the empty line after the maze")
+    width = data.find(b"\n")
+    if width == 0:
+        raise LoadError("The maze has no cells")
+    if (end + 1) % (width + 1) != 0:
+        raise LoadError("The rows of the maze are not all the same width")
+    height = (end + 1) // (width + 1)
+
+    entry, exit, path = parse_footer(bytes(data[end + 2:]))
+    dims = IVec2(width, height)
+    for name, cell in (("entry", entry), ("exit", exit)):
+        if not (0 <= cell.x < width and 0 <= cell.y < height):
+            raise LoadError(f"The {name} {cell} is out of bounds of the maze")
+
+    maze = Maze(dims, entry, exit)
+    horizontal_count = maze.storage.horizontal_count
+    flags = bytearray(len(maze.storage))
+    mask = int.from_bytes(b"\x01" * width)
+    for y in range(height):
+        start = y * (width + 1)
+        line = data[start:start + width + 1]
+        if line.find(b"\n") != width:
+            raise LoadError(f"Row {y} is not {width} cells wide")
+        cells = line[:-1].translate(HEX_DECODE)
+        if cells.find(b"\xff") != -1:
+            raise LoadError(f"Row {y} holds a character that is not hex")
+        packed = int.from_bytes(cells)
+        north = (packed & mask).to_bytes(width)
+        east = (packed >> 1 & mask).to_bytes(width)
+        south = (packed >> 2 & mask).to_bytes(width)
+        west = (packed >> 3 & mask).to_bytes(width)
+
+        if y == 0:
+            flags[:width] = north
+        elif flags[y * width:(y + 1) * width] != north:
+            raise LoadError(
+                f"The north walls of row {y} do not match the south walls "
+                + f"of row {y - 1}"
+            )
+        flags[(y + 1) * width:(y + 2) * width] = south
+        if east[:-1] != west[1:]:
+            raise LoadError(
+                f"The east and west walls of row {y} do not match"
+            )
+        sides = horizontal_count + y * (width + 1)
+        flags[sides:sides + width] = west
+        flags[sides + width] = east[-1]
+
+    maze.storage.load_flags(flags)
+    return LoadedMaze(maze, path)
+
+
+def parse_footer(
+    footer: bytes,
+) -> tuple[CellCoord, CellCoord, list[Cardinal] | None]:
+    """
+    Parses the entry, exit and path lines following the maze
+    May raise a LoadError
+    """
+    try:
+        lines = footer.decode("ascii").split("\n")
+    except UnicodeDecodeError:
+        raise LoadError("The lines after the maze are not ascii")
+    if len(lines) < 2:
+        raise LoadError("Missing the entry and exit after the maze")
+    if any(line != "" for line in lines[3:]):
+        raise LoadError("Unexpected lines after the path")
+
+    def parse_cell(name: str, line: str) -> CellCoord:
+        try:
+            x, y = map(int, line.split(","))
+        except ValueError:
+            raise LoadError(f"Invalid {name} '{line}', expected 'x,y'")
+        return CellCoord(x, y)
+
+    entry = parse_cell("entry", lines[0])
+    exit = parse_cell("exit", lines[1])
+    if len(lines) < 3 or lines[2] == "":
+        return (entry, exit, None)
+    try:
+        path = [CARDINALS[char] for char in lines[2]]
+    except KeyError as e:
+        raise LoadError(f"Invalid direction {e.args[0]} in the path")
+    return (entry, exit, path)
+
+
+def unpack_bits(packed: bytes, count: int) -> bytes:
+    """
+    Unpacks the first count bits of the given bytes, most significant bit
+    first, to one byte per bit, zero or one
+    """
+    bits = format(int.from_bytes(packed), f"0{len(packed) * 8}b")
+    return bits[:count].encode().translate(BIT_DECODE)
+
+
+class BinaryOutput:
+    """
+    A maze in the binary format of output.write_binary_output, decoded
+    straight from the given buffer, usually a memory mapped file, see
+    open_binary_output
+
+    The header is followed by the walls, each row of cells being packed as
+    its north walls then its vertical walls from west to east, one bit per
+    wall, with the south walls of the last row at the end, such that any row
+    is decoded from a fixed offset without reading the others, then by the
+    path as runs of directions, see output.pack_path
+    May raise a LoadError
+    """
+
+    def __init__(self, data: bytes | mmap.mmap) -> None:
+        if len(data) < BINARY_HEADER.size:
+            raise LoadError("The binary header is truncated")
+        (
+            magic,
+            version,
+            flags,
+            _,
+            width,
+            height,
+            entry_x,
+            entry_y,
+            exit_x,
+            exit_y,
+            seed,
+            engine,
+            path_size,
+        ) = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC:
+            raise LoadError("The file is not in the binary format")
+        if version != BINARY_VERSION:
+            raise LoadError(f"Unsupported binary format version {version}")
+        if width == 0 or height == 0:
+            raise LoadError("The maze has no cells")
+        self.dims: IVec2 = IVec2(width, height)
+        self.entry: CellCoord = CellCoord(entry_x, entry_y)
+        self.exit: CellCoord = CellCoord(exit_x, exit_y)
+        for name, cell in (("entry", self.entry), ("exit", self.exit)):
+            if not (0 <= cell.x < width and 0 <= cell.y < height):
+                raise LoadError(
+                    f"The {name} {cell} is out of bounds of the maze"
+                )
+        self.seed: int | None = seed if flags & BINARY_SEED else None
+        try:
+            self.engine: str = engine.rstrip(b"\0").decode("ascii")
+        except UnicodeDecodeError:
+            raise LoadError("The engine name is not ascii")
+
+        self.__data = data
+        self.__line, vertical = binary_strides(width)
+        self.__stride = self.__line + vertical
+        self.__path = BINARY_HEADER.size + height * self.__stride + self.__line
+        self.__has_path = flags & BINARY_PATH != 0
+        if len(data) != self.__path + path_size:
+            raise LoadError(
+                f"The file is {len(data)} bytes long, but its header "
+                + f"describes {self.__path + path_size} bytes"
+            )
+
+    def row(self, y: int) -> tuple[bytes, bytes, bytes, bytes]:
+        """
+        Decodes the north, east, south and west walls of the given row, one
+        byte per cell, zero or one
+        """
+        width, height = self.dims.xy()
+        if not 0 <= y < height:
+            raise Exception(f"Row {y} is out of bounds of the maze")
+        start = BINARY_HEADER.size + y * self.__stride
+        end = start + self.__stride
+        vertical = unpack_bits(self.__data[start + self.__line:end], width + 1)
+        return (
+            unpack_bits(self.__data[start:start + self.__line], width),
+            vertical[1:],
+            unpack_bits(self.__data[end:end + self.__line], width),
+            vertical[:-1],
+        )
+
+    def row_hex(self, y: int) -> str:
+        """
+        Decodes the given row to its line in the text format
+        """
+        return hex_row(*self.row(y))
+
+    def walls(self) -> bytearray:
+        """
+        Decodes every wall to one byte per wall id, as in the wall storage
+        """
+        width, height = self.dims.xy()
+        data = self.__data
+        horizontal_count = (height + 1) * width
+        res = bytearray(horizontal_count + height * (width + 1))
+        for y in range(height + 1):
+            start = BINARY_HEADER.size + y * self.__stride
+            res[y * width:(y + 1) * width] = unpack_bits(
+                data[start:start + self.__line], width
+            )
+            if y == height:
+                break
+            sides = horizontal_count + y * (width + 1)
+            res[sides:sides + width + 1] = unpack_bits(
+                data[start + self.__line:start + self.__stride], width + 1
+            )
+        return res
+
+    def path(self) -> list[Cardinal] | None:
+        """
+        Decodes the path, None if it was not written
+        """
+        if not self.__has_path:
+            return None
+        cardinals = Cardinal.all()
+        res: list[Cardinal] = []
+        for run in self.__data[self.__path:]:
+            res += [cardinals[run & 3]] * ((run >> 2) + 1)
+        return res
+
+    def loaded(self) -> LoadedMaze:
+        """
+        Decodes the whole maze along with its path
+        """
+        maze = Maze(self.dims, self.entry, self.exit)
+        maze.storage.load_flags(self.walls())
+        return LoadedMaze(maze, self.path())
+
+
+@contextmanager
+def open_binary_output(filename: str) -> Generator[BinaryOutput]:
+    """
+    Memory maps an output file in the binary format for the duration of the
+    context, such that its rows are only read as they are decoded
+    May raise a LoadError
+    """
+    try:
+        f = open(filename, "rb")
+    except OSError:
+        raise LoadError(f"Failed to read file {filename}")
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise LoadError(f"The file {filename} is empty")
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            raise LoadError(f"Failed to read file {filename}")
+        with data:
+            yield BinaryOutput(data)
+
+
+def check_loaded(loaded: LoadedMaze) -> list[str]:
+    """
+    Pathfinds through a loaded maze again and checks it against the subject
+    Returns the list of issues found, empty if there are none
+    """
+    maze = loaded.maze
+    width, height = maze.dims.xy()
+    flags = maze.storage.flags()
+    horizontal_count = maze.storage.horizontal_count
+    issues = []
+
+    outline = (
+        flags[:width]
+        + flags[height * width:horizontal_count]
+        + flags[horizontal_count::width + 1]
+        + flags[horizontal_count + width::width + 1]
+    )
+    if outline.find(0) != -1:
+        issues.append("The outline of the maze is not entirely filled")
+
+    shortest = pathfind_bfs(maze)
+    if shortest is None:
+        issues.append("There is no path from the entry to the exit")
+    if loaded.path is None:
+        return issues
+
+    cell = maze.entry
+    for card in loaded.path:
+        if maze.get_wall(cell.get_wall(card)):
+            issues.append(
+                f"The path goes through the {card.name.lower()} wall of "
+                + f"cell {cell}"
+            )
+            return issues
+        cell = cell.get_neighbour(card)
+        if not maze.check_cell(cell):
+            issues.append(f"The path leaves the maze at {cell}")
+            return issues
+    if cell != maze.exit:
+        issues.append(f"The path ends at {cell} rather than at the exit")
+    elif shortest is not None and len(loaded.path) > len(shortest):
+        issues.append(
+            f"The path is {len(loaded.path)} steps long, but the shortest "
+            + f"one is {len(shortest)}"
+        )
+    return issues
@@ -1,6 +1,5 @@
 from mazegen.maze import Maze
 from mazegen.utils import WallCoord
-import random
 
 
 def make_empty(
@@ -8,9 +7,15 @@ def make_empty(
     walls_const: set[WallCoord],
 ) -> None:
     """
-    Clears all the walls of the maze
+    Clears all the walls of the maze, as a single batch
     """
-    walls = [wall for wall in maze.walls_full() if wall not in walls_const]
-    random.shuffle(walls)
-    for wall in walls:
-        maze.set_wall(wall, False)
+    grid = maze.grid
+    const = {grid.wall_id(wall) for wall in walls_const}
+    maze.set_walls_id(
+        [
+            wall_id
+            for wall_id in maze.storage.full_indices()
+            if wall_id not in const
+        ],
+        False,
+    )
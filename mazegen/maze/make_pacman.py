@@ -1,5 +1,5 @@
 from mazegen.maze import Maze
-from mazegen.utils import WallCoord
+from mazegen.utils import WallCoord, resolve_rng
 import random
 
 from mazegen.maze import PacmanTracker
@@ -10,27 +10,40 @@ def make_pacman(
     walls_const: set[WallCoord],
     pacman_tracker: PacmanTracker,
     iterations: int = 10,
+    rng: random.Random | None = None,
 ) -> None:
     """
     Heuristically attempts the minimize the amount of impasses in the maze
+    The walls are picked through rng, the random module by default
+    Impasses and leaf walls are read from the degrees and junctions of the
+    tracker, and a pass which could not change anything is skipped without
+    drawing from rng
     """
+    rng = resolve_rng(rng)
+    const = bytearray(maze.grid.wall_count)
+    for const_wall in walls_const:
+        const_id = maze.grid.wall_id(const_wall)
+        if const_id != -1:
+            const[const_id] = 1
     for _ in range(0, iterations):
         walls = pacman_tracker.clear()
+        if not pacman_tracker.any_impass(walls, const):
+            break
         n = 0
         while len(walls):
-            i = random.randrange(len(walls))
+            i = rng.randrange(len(walls))
             wall = walls[i]
             del walls[i]
-            if not maze.get_wall(wall) or wall in walls_const:
+            if wall < 0 or not maze.get_wall_id(wall) or const[wall]:
                 continue
-            leaf_neighbours = maze.wall_leaf_neighbours(wall)
-            if not maze.wall_causes_impass(wall):
+            if not pacman_tracker.causes_impass(wall):
                 continue
+            leaf_neighbours = pacman_tracker.leaf_neighbours(wall)
             if len(leaf_neighbours) == 0:
-                maze.set_wall(wall, False)
+                maze.set_wall_id(wall, False)
             else:
-                maze.set_wall(wall, False)
-                maze.set_wall(random.choice(leaf_neighbours), True)
+                maze.set_wall_id(wall, False)
+                maze.set_wall_id(rng.choice(leaf_neighbours), True)
             n += 1
         if n == 0:
             break
@@ -1,4 +1,6 @@
+from collections.abc import Iterable
 from mazegen.maze import Maze
+from mazegen.utils import WallCoord, resolve_rng
 import random
 
 from mazegen.maze import NetworkTracker
@@ -7,13 +9,30 @@ from mazegen.maze import NetworkTracker
 def make_perfect(
     maze: Maze,
     tracker: NetworkTracker,
+    rng: random.Random | None = None,
+    dirty: Iterable[WallCoord] | None = None,
 ) -> None:
     """
     Incrementally fills every wall of the maze that doesn't cause it to be
-    bisected
+    bisected, in an order drawn from rng, the random module by default
+
+    If dirty is given, the maze is expected to have been perfect before the
+    given walls changed, as told by a DirtyTracker, and only those are gone
+    through, sorted by id then shuffled, which is enough as any loop made
+    since goes through one of the walls emptied since
     """
-    empty = list(maze.walls_empty())
-    random.shuffle(empty)
+    rng = resolve_rng(rng)
+    if dirty is None:
+        empty = list(maze.walls_empty())
+    else:
+        grid = maze.grid
+        ids = sorted(grid.wall_id(wall) for wall in dirty)
+        empty = [
+            grid.wall(wall_id)
+            for wall_id in ids
+            if wall_id != -1 and not maze.get_wall_id(wall_id)
+        ]
+    rng.shuffle(empty)
     for wall in empty:
         if not tracker.wall_bisects(wall):
             maze.set_wall(wall, True)
@@ -0,0 +1,35 @@
+from mazegen.maze import Maze
+from mazegen.utils import DisjointSet, resolve_rng
+import random
+
+
+def make_perfect_kruskal(
+    maze: Maze, rng: random.Random | None = None
+) -> DisjointSet:
+    """
+    Fills every wall of the maze that doesn't cause it to be bisected, by
+    going through the empty walls and only keeping open those which join
+    distinct sets of cells, all of the outside of the maze being one set
+    Unlike make_perfect, this needs no tracker, but the work done is not
+    kept for later passes
+    The order is drawn from rng, the random module by default
+    Returns the sets of cells, the outside being the last one
+    """
+    rng = resolve_rng(rng)
+    grid = maze.grid
+    outside = grid.cell_count
+    cells = DisjointSet(outside + 1)
+    wall_cells = grid.wall_cells
+
+    empty = [
+        wall for wall in range(grid.wall_count) if not maze.get_wall_id(wall)
+    ]
+    rng.shuffle(empty)
+    for wall in empty:
+        a = wall_cells[2 * wall]
+        b = wall_cells[2 * wall + 1]
+        if not cells.union(
+            a if a != -1 else outside, b if b != -1 else outside
+        ):
+            maze.set_wall_id(wall, True)
+    return cells
@@ -0,0 +1,144 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from mazegen.maze.maze import Maze
+from mazegen.maze.make_perfect_kruskal import make_perfect_kruskal
+from mazegen.utils import DisjointSet, IVec2, resolve_rng
+import random
+
+TILE_SIZE = IVec2(256, 256)
+
+
+def perfect_tile(
+    dims: tuple[int, int], walls: bytes, seed: int
+) -> tuple[bytes, bytes]:
+    """
+    Makes a single tile perfect through make_perfect_kruskal, from its walls
+    by dense index as if it were a maze of its own, its outline, shared
+    with the neighbouring tiles, being full such that it is left untouched
+    Returns the walls of the tile, and the representative cell of the set
+    of every cell as native ints, such that the tiles may be stitched
+    """
+    maze = Maze(IVec2(*dims), IVec2.splat(0), IVec2.splat(0))
+    maze.storage.load_flags(walls)
+    cells = make_perfect_kruskal(maze, random.Random(seed))
+    labels = array("i", map(cells.find, range(maze.grid.cell_count)))
+    return (bytes(maze.storage.flags()), labels.tobytes())
+
+
+def make_perfect_tiled(
+    maze: Maze,
+    rng: random.Random | None = None,
+    tile: IVec2 = TILE_SIZE,
+    workers: int | None = None,
+) -> None:
+    """
+    Same as make_perfect_kruskal, with the grid split into tiles of the
+    given size, each made perfect independently over a pool of worker
+    processes, as many as cpus by default, or in this process if workers
+    is 0 or if there is a single tile, see perfect_tile
+    Each tile draws from its own generator, seeded from rng, the random
+    module by default, such that the maze does not depend on the number of
+    workers
+
+    The sets of cells left in every tile are then stitched together through
+    Kruskal's algorithm over the empty walls between tiles only, in random
+    order, which opens exactly one wall per edge of a spanning tree of the
+    graph of these sets, the whole outside being one set as in
+    make_perfect_kruskal, such that the full walls of the pattern and
+    outline are kept and no region is bisected
+    """
+    rng = resolve_rng(rng)
+    width, height = maze.dims.xy()
+    tile_width, tile_height = min(tile.x, width), min(tile.y, height)
+    if tile_width < 1 or tile_height < 1:
+        return
+    horizontal_count = maze.storage.horizontal_count
+    flags = maze.storage.flags()
+
+    origins = [
+        (x, y)
+        for y in range(0, height, tile_height)
+        for x in range(0, width, tile_width)
+    ]
+    sizes = [
+        (min(tile_width, width - x), min(tile_height, height - y))
+        for x, y in origins
+    ]
+    tiles = []
+    for (x, y), (w, h) in zip(origins, sizes):
+        walls = bytearray([1]) * w
+        for a in range(y + 1, y + h):
+            walls += flags[a * width + x:a * width + x + w]
+        walls += bytearray([1]) * w
+        for a in range(y, y + h):
+            start = horizontal_count + a * (width + 1) + x
+            walls += b"\x01" + flags[start + 1:start + w] + b"\x01"
+        tiles.append(bytes(walls))
+    seeds = [rng.getrandbits(64) for _ in origins]
+
+    if workers == 0 or len(origins) == 1:
+        results = list(map(perfect_tile, sizes, tiles, seeds))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(perfect_tile, sizes, tiles, seeds))
+
+    # The sets of every tile are numbered from the index of its first cell
+    # in the order of the tiles, the outside coming after them all
+    bases = [0]
+    for w, h in sizes:
+        bases.append(bases[-1] + w * h)
+    labels = []
+    filled_ids = []
+    for (x, y), (w, h), before, (after, tile_labels) in zip(
+        origins, sizes, tiles, results
+    ):
+        labels.append(array("i", tile_labels))
+        filled = (int.from_bytes(before) ^ int.from_bytes(after)).to_bytes(
+            len(before)
+        )
+        idx = filled.find(1)
+        while idx != -1:
+            if idx < (h + 1) * w:
+                a, b = divmod(idx, w)
+                filled_ids.append((y + a) * width + x + b)
+            else:
+                a, b = divmod(idx - (h + 1) * w, w + 1)
+                filled_ids.append(
+                    horizontal_count + (y + a) * (width + 1) + x + b
+                )
+            idx = filled.find(1, idx + 1)
+
+    tiles_x = len(range(0, width, tile_width))
+
+    def label(cell: int) -> int:
+        if cell == -1:
+            return bases[-1]
+        y, x = divmod(cell, width)
+        idx = y // tile_height * tiles_x + x // tile_width
+        origin_x, origin_y = origins[idx]
+        local = (y - origin_y) * sizes[idx][0] + x - origin_x
+        return bases[idx] + labels[idx][local]
+
+    between = []
+    for a in (*range(0, height, tile_height), height):
+        line = flags[a * width:(a + 1) * width]
+        b = line.find(0)
+        while b != -1:
+            between.append(a * width + b)
+            b = line.find(0, b + 1)
+    for b in (*range(0, width, tile_width), width):
+        column = flags[horizontal_count + b::width + 1]
+        a = column.find(0)
+        while a != -1:
+            between.append(horizontal_count + a * (width + 1) + b)
+            a = column.find(0, a + 1)
+
+    rng.shuffle(between)
+    sets = DisjointSet(bases[-1] + 1)
+    wall_cells = maze.grid.wall_cells
+    for wall in between:
+        if not sets.union(
+            label(wall_cells[2 * wall]), label(wall_cells[2 * wall + 1])
+        ):
+            filled_ids.append(wall)
+    maze.set_walls_id(filled_ids, True)
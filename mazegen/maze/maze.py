@@ -1,31 +1,85 @@
-from typing import Callable, Generator, Iterable, overload
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    Literal,
+    overload,
+)
 from mazegen.config.config_parser import Config
 from mazegen.utils import (
     CellCoord,
+    Grid,
     Orientation,
     WallCoord,
     IVec2,
 )
+from mazegen.maze.wall_storage import ArrayWallStorage, WallStorage
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+    type WallPlanes = tuple[NDArray[np.bool_], NDArray[np.bool_]]
 
 type MazeObserver = Callable[[WallCoord], None]
+type MazeBatchObserver = Callable[[list[WallCoord]], None]
+
+
+@dataclass(frozen=True)
+class MazeSnapshot:
+    """
+    The walls, entry and exit of a maze at some point, see Maze.snapshot
+    """
+
+    storage: WallStorage
+    entry: CellCoord
+    exit: CellCoord
 
 
 class Maze:
     """
     A simple maze class, which is simply a set of filled walls
-    Its observers are called whenever the status of a wall changes
+    Its observers are called whenever the status of a wall changes, its batch
+    observers with the list of walls that changed, once per batch
+    Within a batch, changes are only delivered once it ends, coalesced such
+    that a wall that got back to its previous status is not delivered
+    The walls are kept in a storage, by default an array one
+    Walls and cells may also be handled through their ids, as encoded by its
+    grid, without building coordinate objects
+    It may be converted to and from NumPy arrays, see to_numpy, NumPy only
+    being imported then
     """
 
     @overload
-    def __init__(self, config: Config) -> None: ...
+    def __init__(
+        self,
+        config: Config,
+        *,
+        storage: Callable[[IVec2], WallStorage] = ArrayWallStorage,
+    ) -> None: ...
+
     @overload
-    def __init__(self, dims: IVec2, entry: IVec2, exit: IVec2, /) -> None: ...
+    def __init__(
+        self,
+        dims: IVec2,
+        entry: IVec2,
+        exit: IVec2,
+        /,
+        *,
+        storage: Callable[[IVec2], WallStorage] = ArrayWallStorage,
+    ) -> None: ...
 
     def __init__(
         self,
         config: Config | IVec2,
         entry: IVec2 = IVec2.splat(0),
         exit: IVec2 = IVec2.splat(0),
+        *,
+        storage: Callable[[IVec2], WallStorage] = ArrayWallStorage,
     ) -> None:
         self.dims = (
             IVec2(config.width, config.height)
@@ -33,6 +87,9 @@ class Maze:
             else config
         )
         self.observers: set[MazeObserver] = set()
+        self.batch_observers: set[MazeBatchObserver] = set()
+        self.__batch_depth: int = 0
+        self.__batched: dict[WallCoord, None] = {}
         self.entry: CellCoord = CellCoord(entry)
         self.exit: CellCoord = CellCoord(exit)
         if isinstance(config, Config):
@@ -40,46 +97,279 @@ class Maze:
                 self.entry = CellCoord(config.entry)
             if config.exit is not None:
                 self.exit = CellCoord(config.exit)
-        self.__walls_full: dict[WallCoord, None] = {}
+        self.storage: WallStorage = storage(self.dims)
+        self.grid: Grid = Grid.of(self.dims.x, self.dims.y)
+
+    @overload
+    def to_numpy(self, cells: Literal[False] = False) -> "WallPlanes": ...
+
+    @overload
+    def to_numpy(self, cells: Literal[True]) -> "NDArray[np.uint8]": ...
+
+    def to_numpy(
+        self, cells: bool = False
+    ) -> "WallPlanes | NDArray[np.uint8]":
+        """
+        Returns the walls as two boolean arrays, the horizontal walls of
+        shape (height + 1, width), indexed by line then column, and the
+        vertical walls of shape (height, width + 1), indexed by row then
+        column, or if cells is set, as a single array of shape (height,
+        width) of the walls of each cell, as in the output file: north is
+        1, east 2, south 4 and west 8
+        The planes are read only views of the storage if it keeps its walls
+        as bytes, which then follow the changes of the maze, a fork first
+        copying the bytes it shares, see ArrayWallStorage.own_flags, and
+        copies otherwise
+        """
+        import numpy as np
+
+        width, height = self.dims.xy()
+        storage = self.storage
+        flags = np.frombuffer(
+            (
+                storage.own_flags()
+                if isinstance(storage, ArrayWallStorage)
+                else storage.flags()
+            ),
+            dtype=np.uint8,
+        )
+        count = self.storage.horizontal_count
+        horizontal = flags[:count].view(np.bool_).reshape(height + 1, width)
+        vertical = flags[count:].view(np.bool_).reshape(height, width + 1)
+        if not cells:
+            horizontal.flags.writeable = False
+            vertical.flags.writeable = False
+            return (horizontal, vertical)
+        north = horizontal[:-1].astype(np.uint8)
+        south = horizontal[1:].astype(np.uint8)
+        west = vertical[:, :-1].astype(np.uint8)
+        east = vertical[:, 1:].astype(np.uint8)
+        return (north | east << 1 | south << 2 | west << 3).astype(np.uint8)
+
+    @staticmethod
+    def from_numpy(
+        walls: "WallPlanes | NDArray[np.uint8]",
+        entry: IVec2 = IVec2.splat(0),
+        exit: IVec2 = IVec2.splat(0),
+        *,
+        storage: Callable[[IVec2], WallStorage] = ArrayWallStorage,
+    ) -> "Maze":
+        """
+        Makes a maze from walls as returned by to_numpy, either both planes
+        of walls, non zero meaning full, or the walls of each cell, in which
+        case the cells on each side of a wall must agree
+        """
+        import numpy as np
+
+        if isinstance(walls, tuple):
+            horizontal, vertical = map(np.asarray, walls)
+        else:
+            cells = np.asarray(walls)
+            if cells.ndim != 2:
+                raise Exception(f"Expected 2 dimensions, got {cells.ndim}")
+            height, width = cells.shape
+            north, east, south, west = (
+                (cells & bit) != 0 for bit in (1, 2, 4, 8)
+            )
+            if not (
+                np.array_equal(north[1:], south[:-1])
+                and np.array_equal(east[:, :-1], west[:, 1:])
+            ):
+                raise Exception("Neighbouring cells disagree on their walls")
+            horizontal = np.zeros((height + 1, width), np.bool_)
+            vertical = np.zeros((height, width + 1), np.bool_)
+            horizontal[:-1] = north
+            horizontal[1:] |= south
+            vertical[:, 1:] = east
+            vertical[:, :-1] |= west
+        if horizontal.ndim != 2 or vertical.ndim != 2:
+            raise Exception("Expected 2 dimensions for both planes of walls")
+        height = horizontal.shape[0] - 1
+        width = horizontal.shape[1]
+        if vertical.shape != (height, width + 1):
+            raise Exception(
+                f"Expected vertical walls of shape {(height, width + 1)} "
+                + f"for horizontal walls of shape {horizontal.shape}, got "
+                + f"{vertical.shape} instead"
+            )
+        res = Maze(IVec2(width, height), entry, exit, storage=storage)
+        res.storage.load_flags(
+            np.concatenate((horizontal.ravel(), vertical.ravel()))
+            .astype(np.uint8)
+            .tobytes()
+        )
+        return res
 
     def get_wall(self, coord: WallCoord) -> bool:
         """
         Returns whether said wall is filled in
         """
-        return coord in self.__walls_full
+        return self.storage.get_wall(coord)
 
     def set_wall(self, wall: WallCoord, value: bool) -> None:
         """
         Sets the status of the wall, as in whether it is filled, and
         calls observers if needed
         """
-        if self.get_wall(wall) != value:
-            if value:
-                self.__walls_full[wall] = None
-            else:
-                self.__walls_full.pop(wall)
+        if self.storage.replace(wall, value):
+            self.__changed(wall)
+
+    def get_wall_id(self, wall_id: int) -> bool:
+        """
+        Returns whether the wall of the given id is filled in
+        """
+        return self.storage.get_index(wall_id)
+
+    def set_wall_id(self, wall_id: int, value: bool) -> None:
+        """
+        Sets the status of the wall of the given id, and calls observers if
+        needed
+        """
+        if self.storage.get_index(wall_id) == value:
+            return
+        self.storage.set_index(wall_id, value)
+        self.__changed(self.grid.wall(wall_id))
+
+    def __changed(self, wall: WallCoord) -> None:
+        """
+        Delivers a change of the given wall to observers, or keeps it for the
+        end of the current batch
+        """
+        if self.__batch_depth == 0:
+            self.__notify([wall])
+        elif wall in self.__batched:
+            del self.__batched[wall]
+        else:
+            self.__batched[wall] = None
+
+    def set_walls(self, walls: Iterable[WallCoord], value: bool) -> None:
+        """
+        Sets the status of all the given walls within a single batch
+        """
+        with self.batch():
+            for wall in walls:
+                self.set_wall(wall, value)
 
-            for observer in self.observers:
+    def snapshot(self) -> MazeSnapshot:
+        """
+        Returns the current state of the maze, to be restored later, its
+        walls being a fork of the storage, see WallStorage.fork, copied only
+        once either changes
+        """
+        return MazeSnapshot(self.storage.fork(), self.entry, self.exit)
+
+    def restore(self, snapshot: MazeSnapshot) -> None:
+        """
+        Sets the walls, entry and exit back to those of the given snapshot
+        of this maze, the walls that differ being set within a single batch,
+        such that observers and trackers follow
+        """
+        if snapshot.storage.dims != self.dims:
+            raise Exception(
+                f"Cannot restore a snapshot of dims {snapshot.storage.dims} "
+                + f"to a maze of dims {self.dims}"
+            )
+        # Both are read before any change, as they may be the same bytes
+        current = self.storage.flags()
+        target = snapshot.storage.flags()
+        changed = (
+            int.from_bytes(current) ^ int.from_bytes(target)
+        ).to_bytes(len(current))
+        filled: list[int] = []
+        emptied: list[int] = []
+        wall_id = changed.find(1)
+        while wall_id != -1:
+            (filled if target[wall_id] else emptied).append(wall_id)
+            wall_id = changed.find(1, wall_id + 1)
+        with self.batch():
+            self.set_walls_id(filled, True)
+            self.set_walls_id(emptied, False)
+        self.entry = snapshot.entry
+        self.exit = snapshot.exit
+
+    def fork(self) -> "Maze":
+        """
+        Returns a maze of the same walls, entry and exit, whose storage is a
+        fork of this one's, see WallStorage.fork
+        Observers are not carried over, each tracker having its own fork
+        method to follow the new maze
+        """
+        return Maze(
+            self.dims,
+            self.entry,
+            self.exit,
+            storage=lambda _: self.storage.fork(),
+        )
+
+    def set_walls_id(self, wall_ids: Iterable[int], value: bool) -> None:
+        """
+        Sets the status of all the walls of the given ids within a single
+        batch, straight in the storage if there are no observers to call
+        """
+        if len(self.observers) == 0 and len(self.batch_observers) == 0:
+            for wall_id in wall_ids:
+                self.storage.set_index(wall_id, value)
+            return
+        with self.batch():
+            for wall_id in wall_ids:
+                self.set_wall_id(wall_id, value)
+
+    @contextmanager
+    def batch(self) -> Generator[None]:
+        """
+        A context within which changes to walls are only delivered to
+        observers once it exits, the outermost batch delivering all the
+        changes of the nested ones
+        """
+        self.__batch_depth += 1
+        try:
+            yield
+        finally:
+            self.__batch_depth -= 1
+            if self.__batch_depth == 0 and len(self.__batched) != 0:
+                walls = list(self.__batched)
+                self.__batched = {}
+                self.__notify(walls)
+
+    def __notify(self, walls: list[WallCoord]) -> None:
+        """
+        Calls the observers with the given walls that changed
+        """
+        for observer in self.observers:
+            for wall in walls:
                 observer(wall)
+        for batch_observer in self.batch_observers:
+            batch_observer(walls)
+
+    def all_walls(self) -> tuple[WallCoord, ...]:
+        """
+        Returns all the wall coords that are contained within this maze, full
+        or not, the horizontal ones line by line then the vertical ones
+        column by column
+        The tuple is made on each call, walls_empty and all_wall_ids
+        iterate without holding every wall
+        """
+        return self.grid.walls
 
-    def all_walls(self) -> Generator[WallCoord]:
+    def all_cells(self) -> tuple[CellCoord, ...]:
         """
-        Returns an iterator over all the wall coords that are contained
-        within this maze, full or not
+        Returns all the cell coords of this maze, in the order of
+        CellCoord.all_up_to
+        The tuple is made on each call
         """
-        for orientation, a_count, b_count in [
-            (Orientation.HORIZONTAL, self.dims.y + 1, self.dims.x),
-            (Orientation.VERTICAL, self.dims.x + 1, self.dims.y),
-        ]:
-            for a in range(0, a_count):
-                for b in range(0, b_count):
-                    yield WallCoord(orientation, a, b)
+        return self.grid.cells
 
-    def all_cells(self) -> Iterable[CellCoord]:
+    def all_wall_ids(self) -> range:
         """
-        Returns an iterator over all the cell coords of this maze
+        Returns the ids of all the walls of this maze
         """
-        return CellCoord(self.dims).all_up_to()
+        return range(self.grid.wall_count)
+
+    def all_cell_ids(self) -> range:
+        """
+        Returns the ids of all the cells of this maze
+        """
+        return range(self.grid.cell_count)
 
     def check_cell(self, cell: CellCoord) -> bool:
         """
@@ -115,25 +405,20 @@ class Maze:
 
     def outline(self) -> None:
         """
-        Fills in the outline of the maze, calling observers as needed
+        Fills in the outline of the maze, calling observers once as a batch
         """
         if self.dims.x < 1 or self.dims.y < 1:
             return
-        for orientation, a_iter, b_iter in [
-            (
-                Orientation.VERTICAL,
-                (0, self.dims.x),
-                range(0, self.dims.y),
-            ),
-            (
-                Orientation.HORIZONTAL,
-                (0, self.dims.y),
-                range(0, self.dims.x),
-            ),
-        ]:
-            for a in a_iter:
-                for b in b_iter:
-                    self.set_wall(WallCoord(orientation, a, b), True)
+        with self.batch():
+            for horizontal, a_iter, b_iter in [
+                (False, (0, self.dims.x), range(0, self.dims.y)),
+                (True, (0, self.dims.y), range(0, self.dims.x)),
+            ]:
+                for a in a_iter:
+                    for b in b_iter:
+                        self.set_wall_id(
+                            self.grid.wall_id_of(horizontal, a, b), True
+                        )
 
     def walls_full(self) -> Iterable[WallCoord]:
         """
@@ -141,7 +426,7 @@ class Maze:
         The iterator is only valid as long as the walls of the maze don't
         change
         """
-        return self.__walls_full
+        return map(self.grid.wall, self.storage.full_indices())
 
     def walls_empty(self) -> Iterable[WallCoord]:
         """
@@ -149,26 +434,43 @@ class Maze:
         The iterator is still valid after a wall has been altered, if it
         was filled it shall not be yielded
         """
-        return filter(lambda w: not self.get_wall(w), self.all_walls())
+        get_index = self.storage.get_index
+        wall = self.grid.wall
+        return (
+            wall(wall_id)
+            for wall_id in self.grid.wall_order
+            if not get_index(wall_id)
+        )
+
+    def walls_empty_ids(self) -> Iterator[int]:
+        """
+        Returns an iterator over the ids of this maze's empty walls, in
+        increasing order, with the same validity as walls_empty
+        """
+        return self.storage.empty_indices()
 
     def wall_causes_impass(self, wall: WallCoord) -> bool:
         """
         Return whether the wall, if full, creates an impass, that is a cell
         with at most 1 empty wall
         """
-        return any(
-            (
-                len(
-                    [
-                        ()
-                        for wall in self.get_walls_checked(list(cell.walls()))
-                        if wall
-                    ]
-                )
-                >= (3 if self.get_wall(wall) else 2)
-            )
-            for cell in wall.neighbour_cells()
-        )
+        wall_id = self.grid.wall_id(wall)
+        return wall_id != -1 and self.wall_causes_impass_id(wall_id)
+
+    def wall_causes_impass_id(self, wall_id: int) -> bool:
+        """
+        Same as wall_causes_impass, for the wall of the given id
+        """
+        get_index = self.storage.get_index
+        cell_walls = self.grid.cell_walls
+        threshold = 3 if get_index(wall_id) else 2
+        for cell in self.grid.wall_cells[2 * wall_id:2 * wall_id + 2]:
+            if cell == -1:
+                continue
+            walls = cell_walls[4 * cell:4 * cell + 4]
+            if sum(map(get_index, walls)) >= threshold:
+                return True
+        return False
 
     def wall_leaf_neighbours(self, wall: WallCoord) -> list[WallCoord]:
         """
@@ -177,11 +479,20 @@ class Maze:
         neighbour walls.
         Returns the result of that operation concatenated for both junctions
         """
-        leaf_f: Callable[
-            [Callable[[WallCoord], list[WallCoord]]], list[WallCoord]
-        ] = lambda f: (
-            list(filter(lambda c: self.check_wall(c), f(wall)))
-            if all(not wall for wall in self.get_walls_checked(f(wall)))
-            else []
-        )
-        return leaf_f(WallCoord.a_neighbours) + leaf_f(WallCoord.b_neighbours)
+        wall_id = self.grid.wall_id(wall)
+        if wall_id == -1:
+            return []
+        return list(map(self.grid.wall, self.wall_leaf_neighbours_id(wall_id)))
+
+    def wall_leaf_neighbours_id(self, wall_id: int) -> list[int]:
+        """
+        Same as wall_leaf_neighbours, for the wall of the given id
+        """
+        get_index = self.storage.get_index
+        wall_neighbours = self.grid.wall_neighbours
+        res = []
+        for start in (6 * wall_id, 6 * wall_id + 3):
+            walls = [e for e in wall_neighbours[start:start + 3] if e != -1]
+            if not any(map(get_index, walls)):
+                res += walls
+        return res
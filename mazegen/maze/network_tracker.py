@@ -3,30 +3,77 @@ from mazegen.utils.coords import (
     split_wall_ccw,
     split_wall_opposite,
 )
-from mazegen.utils import AVLTree, AVLLeaf, SplitWall, WallCoord
-from mazegen.utils.avl import BVHKey
+from mazegen.utils.quadtree import Rect
+from mazegen.utils.sequence_forest import contour_order
+from mazegen.utils import (
+    ArrayAVL,
+    Cardinal,
+    CellCoord,
+    Grid,
+    IVec2,
+    SequenceForest,
+    SplitWall,
+    TreeSequenceForest,
+    WallCoord,
+)
+from collections.abc import Iterable, Iterator
+from typing import Any
 
 
 class DualForest:
     """
     A forest of trees that contour networks
-    AVL trees are used to represent the contours, such that split and
+    Balanced trees are used to represent the contours, such that split and
     merge operations are of complexity O(log n), each tree is a cycle
     of each connex graph boundary
+    The trees are those of the given sequence forest, linked AVL trees by
+    default, or ArrayAVL to keep them in flat arrays
+    Given the grid of the maze, the split walls are taken from it rather than
+    made again for every operation
+
+    Every bounded face of the walls is enclosed by exactly one contour whose
+    least split wall, by contour_order, is a west side, the other contours
+    being the outer walks of groups of walls, such that the number of
+    enclosed regions is maintained in O(1) as walls are filled or emptied
     """
 
     def __init__(
         self,
+        grid: Grid | None = None,
+        sequences: SequenceForest[Any, Any] | None = None,
     ) -> None:
+        self.__grid: Grid | None = grid
         # Trees are left hand chiral
-        self.__trees: set[AVLTree[BVHKey, SplitWall]] = set()
-        self.__revmap: dict[SplitWall, AVLLeaf[BVHKey, SplitWall]] = {}
+        self.__seq: SequenceForest[Any, Any] = (
+            sequences if sequences is not None else TreeSequenceForest()
+        )
+        self.__revmap: dict[SplitWall, Any] = {}
+        self.__regions: int = 0
 
     def __repr__(self) -> str:
-        return (
-            f"DualForest ({len(self.__trees)}):\n    trees:\n"
-            + f"{self.__trees}\n    revmap:\n{self.__revmap}\n"
-        )
+        return f"DualForest ({len(self.__revmap)}):\n{self.__revmap}\n"
+
+    def copy(self) -> "DualForest | None":
+        """
+        Returns a forest of the same contours, or None if they are not kept
+        in an ArrayAVL, the only sequences which may be copied at once
+        """
+        if not isinstance(self.__seq, ArrayAVL):
+            return None
+        res = DualForest(self.__grid, self.__seq.copy())
+        res.__revmap = dict(self.__revmap)
+        res.__regions = self.__regions
+        return res
+
+    def split_walls(self, wall: WallCoord) -> tuple[SplitWall, SplitWall]:
+        """
+        Returns the split wall of each side of the given wall
+        """
+        if self.__grid is not None:
+            wall_id = self.__grid.wall_id(wall)
+            if wall_id != -1:
+                return self.__grid.split_walls(wall_id)
+        return wall.to_split_wall()
 
     def find_split(
         self,
@@ -36,97 +83,125 @@ class DualForest:
         Attemps to find a full split wall starting after the given wall,
         going counter clockwise
         """
-        split_wall = split_wall_opposite(split_wall)
+        if self.__grid is None:
+            split_wall = split_wall_opposite(split_wall)
+            for _ in range(3):
+                split_wall = split_wall_ccw(split_wall)
+                if split_wall in self.__revmap:
+                    return split_wall
+            return None
+        neighbour = self.__grid.neighbour
+        cell, cardinal = split_wall
+        cell, cardinal = neighbour(cell, cardinal), cardinal.opposite()
         for _ in range(3):
-            split_wall = split_wall_ccw(split_wall)
-            if split_wall in self.__revmap:
-                return split_wall
+            cell, cardinal = neighbour(cell, cardinal), cardinal.left()
+            if (cell, cardinal) in self.__revmap:
+                return (cell, cardinal)
         return None
 
+    def successor(self, split_wall: SplitWall) -> SplitWall:
+        """
+        Returns the split wall following the given full one along its
+        contour, which is the next full one counter clockwise, or the other
+        side of the same wall if there is none
+        """
+        res = self.find_split(split_wall)
+        if res is not None:
+            return res
+        cell, cardinal = split_wall
+        if self.__grid is None:
+            return split_wall_opposite(split_wall)
+        return (self.__grid.neighbour(cell, cardinal), cardinal.opposite())
+
+    def fill_walls(self, walls: Iterable[WallCoord]) -> None:
+        """
+        Updates that all these walls are full
+        If the forest is empty, the contours are traced once by following
+        the successor of every split wall, and each tree is built at once,
+        which is linear, rather than filling each wall one after another
+        """
+        if len(self.__revmap) != 0:
+            for wall in walls:
+                self.fill_wall(wall)
+            return
+        revmap = self.__revmap
+        for wall in walls:
+            a_wall, b_wall = self.split_walls(wall)
+            revmap[a_wall] = None
+            revmap[b_wall] = None
+        traced: set[SplitWall] = set()
+        for start in list(revmap):
+            if start in traced:
+                continue
+            contour = [start]
+            curr = self.successor(start)
+            while curr != start:
+                contour.append(curr)
+                curr = self.successor(curr)
+            traced.update(contour)
+            handles, tree = self.__seq.build(contour)
+            revmap.update(zip(contour, handles))
+            if self.__seq.least(tree)[1] is Cardinal.WEST:
+                self.__regions += 1
+
     def fill_wall(self, wall: WallCoord) -> None:
         """
         Updates that this wall is full, and maintains the countour forest
         """
         if self.get_wall(wall):
             return
-        a_wall, b_wall = wall.to_split_wall()
-        a_tree = AVLTree[BVHKey, SplitWall]()
-        b_tree = AVLTree[BVHKey, SplitWall]()
-        self.__revmap[a_wall] = a_tree.append(BVHKey.for_wall(a_wall), a_wall)
-        self.__revmap[b_wall] = b_tree.append(BVHKey.for_wall(b_wall), b_wall)
+        seq = self.__seq
+        revmap = self.__revmap
+        a_wall, b_wall = self.split_walls(wall)
+        revmap[a_wall], a_tree = seq.single(a_wall)
+        revmap[b_wall], b_tree = seq.single(b_wall)
 
         match (self.find_split(a_wall), self.find_split(b_wall)):
             case (None, None):
-                a_tree.rjoin(b_tree)
-                self.__trees.add(a_tree)
+                seq.join(a_tree, b_tree)
             case (None, b_split):
                 # mypy is stupid
                 if b_split is None:
                     raise Exception()
-                b_leaf = self.__revmap.pop(b_split)
-                self.__trees.remove(b_leaf.root())
-                lhs, rhs = b_leaf.split_up()
-                lhs.rjoin(a_tree)
-                lhs.rjoin(b_tree)
-                self.__revmap[b_split] = lhs.append(
-                    BVHKey.for_wall(b_split), b_split
-                )
-                lhs.rjoin(rhs)
-                self.__trees.add(lhs)
+                lhs, rhs = seq.split(revmap.pop(b_split))
+                lhs = seq.join(lhs, a_tree)
+                lhs = seq.join(lhs, b_tree)
+                revmap[b_split], lhs = seq.append(lhs, b_split)
+                seq.join(lhs, rhs)
             case (a_split, None):
                 # mypy is stupid
                 if a_split is None:
                     raise Exception()
-                a_leaf = self.__revmap.pop(a_split)
-                self.__trees.remove(a_leaf.root())
-                lhs, rhs = a_leaf.split_up()
-                lhs.rjoin(b_tree)
-                lhs.rjoin(a_tree)
-                self.__revmap[a_split] = lhs.append(
-                    BVHKey.for_wall(a_split), a_split
-                )
-                lhs.rjoin(rhs)
-                self.__trees.add(lhs)
+                lhs, rhs = seq.split(revmap.pop(a_split))
+                lhs = seq.join(lhs, b_tree)
+                lhs = seq.join(lhs, a_tree)
+                revmap[a_split], lhs = seq.append(lhs, a_split)
+                seq.join(lhs, rhs)
             case (a_split, b_split):
                 # mypy is stupid
                 if a_split is None or b_split is None:
                     raise Exception()
-                a_leaf, b_leaf = self.__revmap.pop(a_split), self.__revmap.pop(
-                    b_split
-                )
-                if a_leaf.root() is b_leaf.root():
-                    self.__trees.remove(a_leaf.root())
-                    lhs, rhs = a_leaf.split_up()
-                    lhs.rjoin(b_tree)
-                    self.__revmap[a_split] = rhs.prepend(
-                        BVHKey.for_wall(a_split), a_split
-                    )
-                    rhs.ljoin(a_tree)
-                    rhs.rjoin(lhs)
-                    lhs, rhs = b_leaf.split_up()
-                    self.__revmap[b_split] = rhs.prepend(
-                        BVHKey.for_wall(b_split), b_split
-                    )
-                    self.__trees.add(lhs)
-                    self.__trees.add(rhs)
+                a_leaf, b_leaf = revmap.pop(a_split), revmap.pop(b_split)
+                if seq.root(a_leaf) == seq.root(b_leaf):
+                    # Closes a loop, which splits a face in two
+                    self.__regions += 1
+                    lhs, rhs = seq.split(a_leaf)
+                    lhs = seq.join(lhs, b_tree)
+                    revmap[a_split], rhs = seq.prepend(rhs, a_split)
+                    rhs = seq.join(a_tree, rhs)
+                    seq.join(rhs, lhs)
+                    lhs, rhs = seq.split(b_leaf)
+                    revmap[b_split], rhs = seq.prepend(rhs, b_split)
                 else:
-                    self.__trees.remove(a_leaf.root())
-                    self.__trees.remove(b_leaf.root())
-                    a_lhs, a_rhs = a_leaf.split_up()
-                    b_lhs, b_rhs = b_leaf.split_up()
-                    self.__revmap[a_split] = a_rhs.prepend(
-                        BVHKey.for_wall(a_split), a_split
-                    )
-                    self.__revmap[b_split] = b_rhs.prepend(
-                        BVHKey.for_wall(b_split), b_split
-                    )
-                    res = a_lhs
-                    res.rjoin(b_tree)
-                    res.rjoin(b_rhs)
-                    res.rjoin(b_lhs)
-                    res.rjoin(a_tree)
-                    res.rjoin(a_rhs)
-                    self.__trees.add(res)
+                    a_lhs, a_rhs = seq.split(a_leaf)
+                    b_lhs, b_rhs = seq.split(b_leaf)
+                    revmap[a_split], a_rhs = seq.prepend(a_rhs, a_split)
+                    revmap[b_split], b_rhs = seq.prepend(b_rhs, b_split)
+                    res = seq.join(a_lhs, b_tree)
+                    res = seq.join(res, b_rhs)
+                    res = seq.join(res, b_lhs)
+                    res = seq.join(res, a_tree)
+                    seq.join(res, a_rhs)
 
     def empty_wall(self, wall: WallCoord) -> None:
         """
@@ -134,65 +209,120 @@ class DualForest:
         """
         if not self.get_wall(wall):
             return
-        a_wall, b_wall = wall.to_split_wall()
-        a_leaf, b_leaf = self.__revmap.pop(a_wall), self.__revmap.pop(b_wall)
-        if a_leaf.root() is b_leaf.root():
-            self.__trees.remove(a_leaf.root())
-            lhs, rhs = a_leaf.split_up()
-            rhs.rjoin(lhs)
-            a_res, b_res = b_leaf.split_up()
-            if a_res.height() > 0:
-                self.__trees.add(a_res)
-            if b_res.height() > 0:
-                self.__trees.add(b_res)
+        seq = self.__seq
+        a_wall, b_wall = self.split_walls(wall)
+        a_leaf = self.__revmap.pop(a_wall)
+        b_leaf = self.__revmap.pop(b_wall)
+        if seq.root(a_leaf) == seq.root(b_leaf):
+            lhs, rhs = seq.split(a_leaf)
+            seq.join(rhs, lhs)
+            seq.split(b_leaf)
         else:
-            self.__trees.remove(a_leaf.root())
-            self.__trees.remove(b_leaf.root())
-            a_lhs, a_rhs = a_leaf.split_up()
-            b_lhs, b_rhs = b_leaf.split_up()
-            res = AVLTree[BVHKey, SplitWall]()
-            res.rjoin(a_lhs)
-            res.rjoin(b_rhs)
-            res.rjoin(b_lhs)
-            res.rjoin(a_rhs)
-            if res.height() > 0:
-                self.__trees.add(res)
+            # Opens a loop, which merges the faces on each side
+            self.__regions -= 1
+            a_lhs, a_rhs = seq.split(a_leaf)
+            b_lhs, b_rhs = seq.split(b_leaf)
+            res = seq.join(a_lhs, b_rhs)
+            res = seq.join(res, b_lhs)
+            seq.join(res, a_rhs)
 
     def get_wall(self, wall: WallCoord) -> bool:
         """
         Checks whether the given wall is full
         """
-        a_wall, b_wall = wall.to_split_wall()
+        a_wall, b_wall = self.split_walls(wall)
         return a_wall in self.__revmap and b_wall in self.__revmap
 
+    def region_count(self) -> int:
+        """
+        Returns the number of bounded faces of the walls
+        """
+        return self.__regions
+
+    def contour(self, split_wall: SplitWall) -> Any:
+        """
+        Returns the tree of the contour of the given full split wall, which
+        compares equal for every split wall of the same contour
+        """
+        return self.__seq.root(self.__revmap[split_wall])
+
+    def least(self, split_wall: SplitWall) -> SplitWall:
+        """
+        Returns the least split wall, by contour_order, of the contour of the
+        given full split wall
+        """
+        return self.__seq.least(self.contour(split_wall))
+
+    def contour_walls(self, contour: Any) -> Iterator[SplitWall]:
+        """
+        Returns an iterator over the split walls of the given contour, as
+        returned by contour, in the order of the contour
+        """
+        return self.__seq.values(contour)
+
+    def cut_off(self, split_wall: SplitWall) -> Rect | None:
+        """
+        Given a side of an empty wall, returns the bounding box of the
+        region which filling the wall would enclose on that side, or None if
+        it would not enclose any
+        Filling it would join the contour after each side, and the one of
+        the given side would be made of it and the split walls from the
+        next full one after it up to the next full one after the other side
+        """
+        cell, cardinal = split_wall
+        if self.__grid is not None:
+            other = (
+                self.__grid.neighbour(cell, cardinal),
+                cardinal.opposite(),
+            )
+        else:
+            other = split_wall_opposite(split_wall)
+        a_split = self.find_split(split_wall)
+        b_split = self.find_split(other)
+        if a_split is None or b_split is None:
+            return None
+        seq = self.__seq
+        a_leaf, b_leaf = self.__revmap[a_split], self.__revmap[b_split]
+        if seq.root(a_leaf) != seq.root(b_leaf):
+            return None
+        (start, end), least = seq.span(a_leaf, b_leaf)
+        if contour_order(split_wall) < contour_order(least):
+            least = split_wall
+        # Otherwise the contour is the outer walk of a group of walls
+        if least[1] is not Cardinal.WEST:
+            return None
+        return (start.lane_min(cell), end.lane_max(cell + IVec2.splat(1)))
+
     def wall_bisects(self, wall: WallCoord) -> bool:
         """
         Returns whether this wall, if full, would split the maze in two
         """
-        a_wall, b_wall = wall.to_split_wall()
+        a_wall, b_wall = self.split_walls(wall)
         a_split = self.find_split(a_wall)
         b_split = self.find_split(b_wall)
         if a_split is None or b_split is None:
             return False
-        a_leaf, b_leaf = self.__revmap[a_split], self.__revmap[b_split]
-        if self.get_wall(wall):
-            return a_leaf.root() is not b_leaf.root()
-        else:
-            return a_leaf.root() is b_leaf.root()
+        root = self.__seq.root
+        same = root(self.__revmap[a_split]) == root(self.__revmap[b_split])
+        return not same if self.get_wall(wall) else same
 
 
 class NetworkTracker:
     """
     A tracker of wall countour networks, used to check maze connectivity
+    Its contours are kept in an ArrayAVL unless other sequences are given
     """
 
-    def __init__(self, maze: Maze) -> None:
+    def __init__(
+        self, maze: Maze, sequences: SequenceForest[Any, Any] | None = None
+    ) -> None:
         self.__maze: Maze = maze
-        self.__forest: DualForest = DualForest()
+        self.__forest: DualForest = DualForest(
+            maze.grid, sequences if sequences is not None else ArrayAVL()
+        )
 
         maze.observers.add(self.__observer)
-        for wall in maze.walls_full():
-            self.__observer(wall)
+        self.__forest.fill_walls(maze.walls_full())
 
     def __observer(self, wall: WallCoord) -> None:
         if self.__maze.get_wall(wall):
@@ -200,12 +330,133 @@ class NetworkTracker:
         else:
             self.__forest.empty_wall(wall)
 
+    def fork(self, maze: Maze) -> "NetworkTracker":
+        """
+        Returns a tracker of the given fork of the tracked maze, see
+        Maze.fork, copying the contours if they are kept in an ArrayAVL and
+        rebuilding them over the fork otherwise
+        """
+        forest = self.__forest.copy()
+        if forest is None:
+            return NetworkTracker(maze, TreeSequenceForest())
+        res = NetworkTracker.__new__(NetworkTracker)
+        res.__maze = maze
+        res.__forest = forest
+        maze.observers.add(res.__observer)
+        return res
+
     def wall_bisects(self, wall: WallCoord) -> bool:
         """
         Returns whether this wall, if full, would split the maze in two
         """
         return self.__forest.wall_bisects(wall)
 
+    def cut_off(self, split_wall: SplitWall) -> Rect | None:
+        """
+        Given a side of an empty wall, returns the bounding box of the
+        region which filling the wall would enclose on that side, or None if
+        it would not enclose any
+        The contours must be kept in a sequence forest with bounds, such as
+        TreeSequenceForest or ArrayAVL(bounds=True)
+        """
+        return self.__forest.cut_off(split_wall)
+
+    def region_count(self) -> int:
+        """
+        Returns the number of regions of cells cut off from each other, in
+        O(1), every cell closed off by the pattern being a region of its own
+        The maze is connected if it is 1 plus the number of closed cells
+        """
+        return self.__forest.region_count()
+
+    def region(self, cell: CellCoord) -> Any:
+        """
+        Returns the contour enclosing the region of the given cell, which
+        compares equal for the cells of the same region, or None if the cell
+        is not enclosed
+        A ray is cast west of the cell through the vertical walls, the first
+        full one being either on the contour of its region, whose least split
+        wall is a west side, or on the outer walk of a group of walls within
+        the region, in which case the ray is cast again from the least split
+        wall of that walk, which lies further west
+        """
+        maze = self.__maze
+        grid = maze.grid
+        flags = maze.storage.flags()
+        x, y = cell.x, cell.y
+        while 0 <= x < grid.width and 0 <= y < grid.height:
+            start = grid.horizontal_count + y * (grid.width + 1)
+            wall_id = flags.rfind(1, start, start + x + 1)
+            if wall_id == -1:
+                return None
+            split_wall = grid.split_walls(wall_id)[0]
+            least, cardinal = self.__forest.least(split_wall)
+            if cardinal is Cardinal.WEST:
+                return self.__forest.contour(split_wall)
+            x, y = least.x, least.y
+        return None
+
+    def connected(self, a: CellCoord, b: CellCoord) -> bool:
+        """
+        Returns whether a path links the given cells, in O(log n) per wall
+        group the rays cross
+        The maze is expected to be outlined, cells not enclosed by any
+        contour, see region, being reported as linked to none
+        """
+        region = self.region(a)
+        if region is None:
+            return False
+        return bool(region == self.region(b))
+
+    def region_cells(self, cell: CellCoord) -> list[CellCoord]:
+        """
+        Returns the cells of the region of the given cell, span by span of
+        cells within a row, or none if it is not enclosed, see region
+        Each span starts east of a vertical wall whose east side lies either
+        on the contour of the region or on the outer walk of a group of walls
+        within it, and runs up to the next full vertical wall, whose west
+        side lies on either too, such that the groups of walls are found
+        from the spans west of them, starting from the contour of the region
+        This takes time in the length of the contours walked and the number
+        of cells returned, plus O(log n) per span
+        """
+        region = self.region(cell)
+        if region is None:
+            return []
+        maze = self.__maze
+        grid = maze.grid
+        flags = maze.storage.flags()
+        forest = self.__forest
+        width = grid.width
+        res: list[CellCoord] = []
+        # The cells whose east side lies on a contour walked so far
+        east: set[int] = set()
+        contours = [region]
+        seen = {region}
+        for contour in contours:
+            starts = []
+            for side, cardinal in forest.contour_walls(contour):
+                if cardinal is Cardinal.WEST:
+                    starts.append(side)
+                elif cardinal is Cardinal.EAST:
+                    east.add(side.y * width + side.x)
+            for start in starts:
+                x, y = start.x, start.y
+                row = grid.horizontal_count + y * (width + 1)
+                end = flags.find(1, row + x + 1, row + width + 1)
+                first = y * width
+                if end == -1:
+                    res += map(grid.cell, range(first + x, first + width))
+                    continue
+                res += map(grid.cell, range(first + x, first + end - row))
+                if first + end - row - 1 in east:
+                    continue
+                other = forest.contour(grid.split_walls(end)[1])
+                if other not in seen:
+                    seen.add(other)
+                    contours.append(other)
+        return res
+
     def end(self) -> None:
         """
         Removes this tracker's observers from the maze
@@ -1,37 +1,58 @@
+from collections.abc import Buffer, Generator, Iterable
+from io import BytesIO, StringIO
+from itertools import groupby
+from typing import BinaryIO, TextIO
 from .maze import Maze
-from mazegen.utils import CellCoord, Cardinal
-from mazegen.maze.path import pathfind_astar
+from mazegen.maze.hex_row import hex_row
+from mazegen.utils import Cardinal, CellCoord, IVec2
+from mazegen.maze.path import pathfind_bfs
+from mazegen.maze.pattern import Pattern
+from mazegen.maze.eller import eller_rows, eller_walls
+import random
+import struct
 
+# The header of the binary format: magic, version, flags, reserved, width,
+# height, entry, exit, seed, engine and the size of the path in bytes
+BINARY_HEADER = struct.Struct("<4sBBHIIIIIIq16sQ")
+BINARY_MAGIC = b"MAZB"
+BINARY_VERSION = 1
+BINARY_SEED = 1
+BINARY_PATH = 2
+BINARY_ENGINE_SIZE = 16
+BINARY_RUN_MAX = 64
 
-def to_hex(cell: list[bool]) -> str:
+BIT_CHARS = bytes(ord("0") if c == 0 else ord("1") for c in range(256))
+
+
+def write_maze(maze: Maze, f: TextIO) -> None:
     """
-    Converts a list of bits to a hex digit
+    Writes the maze to f with hex cells as specified by the subject, one row
+    at a time, straight from the wall bytes of its storage
     """
-    val = (
-        (1 if cell[0] else 0)
-        + (2 if cell[1] else 0)
-        + (4 if cell[2] else 0)
-        + (8 if cell[3] else 0)
-    )
-    return "0123456789ABCDEF"[val]
+    width, height = maze.dims.xy()
+    flags = memoryview(maze.storage.flags())
+    horizontal = flags[: maze.storage.horizontal_count]
+    vertical = flags[maze.storage.horizontal_count:]
+    for y in range(height):
+        sides = vertical[y * (width + 1):(y + 1) * (width + 1)]
+        f.write(
+            hex_row(
+                horizontal[y * width:(y + 1) * width],
+                sides[1:],
+                horizontal[(y + 1) * width:(y + 2) * width],
+                sides[:-1],
+            )
+        )
+        f.write("\n")
 
 
 def format_maze(maze: Maze) -> str:
     """
     Formats the maze to a string in with hex cells as specified by the subject
     """
-    dims = maze.dims
-    maze_str = ""
-    for y in range(dims.y):
-        for x in range(dims.x):
-            cell = CellCoord(x, y)
-            n, e, s, w = map(
-                lambda card: maze.get_wall(cell.get_wall(card)),
-                [Cardinal.NORTH, Cardinal.EAST, Cardinal.SOUTH, Cardinal.WEST],
-            )
-            maze_str += to_hex([n, e, s, w])
-        maze_str += "\n"
-    return maze_str
+    res = StringIO()
+    write_maze(maze, res)
+    return res.getvalue()
 
 
 def format_doors(maze: Maze) -> str:
@@ -48,14 +69,204 @@ def format_path(maze: Maze) -> str:
     Formats the shortest path in the maze to a direction string as specificer
     by the subject
     """
-    path = pathfind_astar(maze)
+    path = pathfind_bfs(maze)
     if path is None:
         raise Exception("Could not pathfind!")
     return "".join(map(str, path)) + "\n"
 
 
+def write_output(maze: Maze, f: TextIO) -> None:
+    """
+    Writes the maze to f as the subject asks, without building the whole
+    output at once
+    """
+    write_maze(maze, f)
+    f.write("\n")
+    f.write(format_doors(maze))
+    f.write(format_path(maze))
+
+
 def format_output(maze: Maze) -> str:
     """
     Formats the maze to an output string as the subject asks
     """
-    return format_maze(maze) + "\n" + format_doors(maze) + format_path(maze)
+    res = StringIO()
+    write_output(maze, res)
+    return res.getvalue()
+
+
+def format_streamed_output(
+    dims: IVec2,
+    entry: CellCoord,
+    exit: CellCoord,
+    pattern: Pattern,
+    rng: random.Random | None = None,
+) -> Generator[str]:
+    """
+    Formats a perfect maze made row by row through Eller's algorithm to the
+    lines of an output string, without ever holding the whole maze
+    The path line is left empty, as finding it requires the whole maze
+    """
+    for row in eller_rows(dims, pattern, rng):
+        yield row + "\n"
+    yield "\n"
+    yield f"{entry.x},{entry.y}\n"
+    yield f"{exit.x},{exit.y}\n"
+    yield "\n"
+
+
+def binary_strides(width: int) -> tuple[int, int]:
+    """
+    The size in bytes of a packed line of horizontal walls, and of a packed
+    row of vertical walls, in the binary format
+    """
+    return ((width + 7) // 8, (width + 8) // 8)
+
+
+def pack_bits(walls: Buffer) -> bytes:
+    """
+    Packs one byte per wall, zero or not, to one bit per wall, most
+    significant bit first, the last byte being padded with zeros
+    """
+    bits = bytes(walls).translate(BIT_CHARS)
+    if len(bits) == 0:
+        return b""
+    pad = -len(bits) % 8
+    return int(bits + b"0" * pad, 2).to_bytes((len(bits) + pad) // 8)
+
+
+def pack_path(path: list[Cardinal]) -> bytes:
+    """
+    Encodes the path as runs of the same direction, one byte per run of at
+    most BINARY_RUN_MAX steps, its length minus one above the two bits of
+    the direction
+    """
+    res = bytearray()
+    for card, steps in groupby(path):
+        count = sum(1 for _ in steps)
+        while count > 0:
+            run = min(count, BINARY_RUN_MAX)
+            res.append((run - 1) << 2 | card._value_)
+            count -= run
+    return bytes(res)
+
+
+def binary_header(
+    dims: IVec2,
+    entry: CellCoord,
+    exit: CellCoord,
+    seed: int | None,
+    engine: str,
+    path: bytes | None,
+) -> bytes:
+    """
+    Formats the header of the binary format, for the given packed path, see
+    pack_path
+    Raises a ValueError if the seed does not fit in a signed 64 bits int,
+    or if the name of the engine is not made of at most 16 ascii characters
+    """
+    if seed is not None and not -(1 << 63) <= seed < 1 << 63:
+        raise ValueError(
+            f"The binary format holds seeds of at most 64 bits, got {seed}"
+        )
+    name = engine.encode("ascii")
+    if len(name) > BINARY_ENGINE_SIZE:
+        raise ValueError(
+            "The binary format holds engine names of at most "
+            + f"{BINARY_ENGINE_SIZE} characters, got {engine!r}"
+        )
+    flags = (BINARY_SEED if seed is not None else 0) | (
+        BINARY_PATH if path is not None else 0
+    )
+    return BINARY_HEADER.pack(
+        BINARY_MAGIC,
+        BINARY_VERSION,
+        flags,
+        0,
+        dims.x,
+        dims.y,
+        entry.x,
+        entry.y,
+        exit.x,
+        exit.y,
+        seed or 0,
+        name,
+        len(path) if path is not None else 0,
+    )
+
+
+def binary_walls(
+    rows: Iterable[tuple[Buffer, Buffer, Buffer]],
+) -> Generator[bytes]:
+    """
+    Packs the walls of the binary format from the north walls, vertical
+    walls from west to east and south walls of each row, one byte per wall
+    Each row is packed as its north line followed by its vertical walls,
+    the south line of the last row closing the maze, such that every row
+    sits at a fixed offset and is read without the others
+    """
+    south: Buffer = b""
+    for north, vertical, south in rows:
+        yield pack_bits(north) + pack_bits(vertical)
+    yield pack_bits(south)
+
+
+def write_binary_output(
+    maze: Maze, f: BinaryIO, seed: int | None = None, engine: str = ""
+) -> None:
+    """
+    Writes the maze to f in the binary format, along with the seed and the
+    name of the engine which made it, which must fit in 64 bits and 16
+    bytes, see binary_header
+    """
+    path = pathfind_bfs(maze)
+    if path is None:
+        raise Exception("Could not pathfind!")
+    packed = pack_path(path)
+    width, height = maze.dims.xy()
+    flags = memoryview(maze.storage.flags())
+    horizontal = flags[: maze.storage.horizontal_count]
+    vertical = flags[maze.storage.horizontal_count:]
+    f.write(
+        binary_header(maze.dims, maze.entry, maze.exit, seed, engine, packed)
+    )
+    f.writelines(
+        binary_walls(
+            (
+                horizontal[y * width:(y + 1) * width],
+                vertical[y * (width + 1):(y + 1) * (width + 1)],
+                horizontal[(y + 1) * width:(y + 2) * width],
+            )
+            for y in range(height)
+        )
+    )
+    f.write(packed)
+
+
+def format_binary_output(
+    maze: Maze, seed: int | None = None, engine: str = ""
+) -> bytes:
+    """
+    Formats the maze to bytes in the binary format, see write_binary_output
+    """
+    res = BytesIO()
+    write_binary_output(maze, res, seed, engine)
+    return res.getvalue()
+
+
+def format_streamed_binary_output(
+    dims: IVec2,
+    entry: CellCoord,
+    exit: CellCoord,
+    pattern: Pattern,
+    rng: random.Random | None = None,
+    seed: int | None = None,
+) -> Generator[bytes]:
+    """
+    Same as format_streamed_output, in the binary format, without a path
+    """
+    yield binary_header(dims, entry, exit, seed, "ELLER", None)
+    yield from binary_walls(
+        (north, b"\x01" + east, south)
+        for north, east, south in eller_walls(dims, pattern, rng)
+    )
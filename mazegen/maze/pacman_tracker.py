@@ -5,26 +5,243 @@ from mazegen.utils import Randset, WallCoord
 
 class PacmanTracker:
     """
-    A simple tracker that keeps track of dirty cells for impass removal
+    A simple tracker that keeps track of dirty cells for impass removal,
+    as the ids of their walls
+    The cells of the ring around the maze are tracked too, such that the
+    walls are drawn in the same order as when they were coordinates, their
+    walls out of bounds being given negative ids of their own, see
+    outer_walls
+
+    Once first needed, it also keeps the number of full walls of every cell,
+    its degree, and of every junction between cells, y * (width + 1) + x,
+    such that impasses and leaf walls are found in O(1)
+    The degrees are followed by a zero, read for the cells out of bounds
+    Both are built through NumPy if it is installed, as are whole passes
+    checked at once, see any_impass
     """
 
     def __init__(self, maze: Maze) -> None:
         self.__maze: Maze = maze
-        self.__dirty: Randset[WallCoord] = Randset()
-        maze.observers.add(self.__observer)
+        self.__dirty: Randset[int] = Randset()
+        self.__degrees: bytearray | None = None
+        self.__junctions: bytearray = bytearray()
+        maze.batch_observers.add(self.__observer)
 
     def __repr__(self) -> str:
         return f"MazeDirtyTracker({self.__dirty})"
 
     def __del__(self) -> None:
-        self.__maze.observers.discard(self.__observer)
+        self.__maze.batch_observers.discard(self.__observer)
+
+    def __observer(self, walls: list[WallCoord]) -> None:
+        grid = self.__maze.grid
+        wall_cells = grid.wall_cells
+        cell_walls = grid.cell_walls
+        degrees = self.__degrees
+        for wall in walls:
+            wall_id = grid.wall_id(wall)
+            if wall_id == -1:
+                continue
+            for side, cell in enumerate(
+                wall_cells[2 * wall_id:2 * wall_id + 2]
+            ):
+                if cell != -1:
+                    for e in cell_walls[4 * cell:4 * cell + 4]:
+                        self.__dirty.add(e)
+                else:
+                    for e in self.outer_walls(wall_id, side):
+                        self.__dirty.add(e)
+            if degrees is None:
+                continue
+            step = 1 if self.__maze.get_wall_id(wall_id) else -1
+            for cell in wall_cells[2 * wall_id:2 * wall_id + 2]:
+                if cell != -1:
+                    degrees[cell] += step
+            for corner in self.corners(wall_id):
+                self.__junctions[corner] += step
+
+    def fork(self, maze: Maze) -> "PacmanTracker":
+        """
+        Returns a tracker of the given fork of the tracked maze, see
+        Maze.fork, with the same dirty walls, and the same degrees and
+        junctions if they were built, which are otherwise built on first use
+        """
+        res = PacmanTracker(maze)
+        res.__dirty = self.__dirty[:]
+        if self.__degrees is not None:
+            res.__degrees = self.__degrees[:]
+            res.__junctions = self.__junctions[:]
+        return res
+
+    def outer_walls(self, wall_id: int, side: int) -> list[int]:
+        """
+        Returns the ids of the walls of the cell out of bounds on the given
+        side of the wall of the given id, in the order of CellCoord.walls
+        The walls out of bounds are given -1 minus their dense index in a
+        maze one cell larger on every side
+        """
+        grid = self.__maze.grid
+        width = grid.width + 2
+        horizontal, a, b = grid.wall_position(wall_id)
+        x, y = (b, a - side) if horizontal else (a - side, b)
+        res = []
+        for horizontal, a, b in (
+            (True, y, x),
+            (True, y + 1, x),
+            (False, x + 1, y),
+            (False, x, y),
+        ):
+            idx = grid.wall_id_of(horizontal, a, b)
+            if idx != -1:
+                res.append(idx)
+            elif horizontal:
+                res.append(-1 - (a + 1) * width - b - 1)
+            else:
+                res.append(
+                    -1
+                    - (grid.height + 3) * width
+                    - (b + 1) * (width + 1)
+                    - a
+                    - 1
+                )
+        return res
+
+    def corners(self, wall_id: int) -> tuple[int, int]:
+        """
+        Returns the junctions at each end of the wall of the given id, in
+        the order of WallCoord.a_neighbours then WallCoord.b_neighbours
+        """
+        grid = self.__maze.grid
+        if wall_id < grid.horizontal_count:
+            corner = wall_id + wall_id // grid.width
+            return (corner, corner + 1)
+        corner = wall_id - grid.horizontal_count
+        return (corner, corner + grid.width + 1)
+
+    def __build(self) -> bytearray:
+        """
+        Counts the full walls of every cell and junction
+        """
+        maze = self.__maze
+        grid = maze.grid
+        flags = maze.storage.flags()
+        try:
+            import numpy as np
+        except ImportError:
+            degrees = bytearray(grid.cell_count + 1)
+            cell_walls = grid.cell_walls
+            for cell in range(grid.cell_count):
+                for wall in cell_walls[4 * cell:4 * cell + 4]:
+                    if flags[wall]:
+                        degrees[cell] += 1
+            self.__junctions = bytearray(
+                (grid.height + 1) * (grid.width + 1)
+            )
+            for wall in maze.storage.full_indices():
+                for corner in self.corners(wall):
+                    self.__junctions[corner] += 1
+            self.__degrees = degrees
+            return degrees
+        full = np.frombuffer(flags, dtype=np.uint8) != 0
+        horizontal = full[:grid.horizontal_count].reshape(
+            grid.height + 1, grid.width
+        ).astype(np.uint8)
+        vertical = full[grid.horizontal_count:].reshape(
+            grid.height, grid.width + 1
+        ).astype(np.uint8)
+        counts = (
+            horizontal[:-1]
+            + horizontal[1:]
+            + vertical[:, :-1]
+            + vertical[:, 1:]
+        )
+        junctions = np.zeros((grid.height + 1, grid.width + 1), np.uint8)
+        junctions[:, :-1] += horizontal
+        junctions[:, 1:] += horizontal
+        junctions[:-1] += vertical
+        junctions[1:] += vertical
+        self.__junctions = bytearray(junctions.tobytes())
+        self.__degrees = bytearray(counts.tobytes()) + b"\0"
+        return self.__degrees
 
-    def __observer(self, wall: WallCoord) -> None:
-        for cell in wall.neighbour_cells():
-            for e in cell.walls():
-                self.__dirty.add(e)
+    @property
+    def degrees(self) -> bytearray:
+        """
+        The number of full walls of every cell, followed by a zero
+        """
+        if self.__degrees is None:
+            return self.__build()
+        return self.__degrees
+
+    @property
+    def junctions(self) -> bytearray:
+        """
+        The number of full walls at every junction between cells
+        """
+        if self.__degrees is None:
+            self.__build()
+        return self.__junctions
+
+    def causes_impass(self, wall_id: int) -> bool:
+        """
+        Same as Maze.wall_causes_impass_id, from the degrees
+        """
+        degrees = self.degrees
+        cells = self.__maze.grid.wall_cells
+        threshold = 3 if self.__maze.get_wall_id(wall_id) else 2
+        return (
+            degrees[cells[2 * wall_id]] >= threshold
+            or degrees[cells[2 * wall_id + 1]] >= threshold
+        )
+
+    def leaf_neighbours(self, wall_id: int) -> list[int]:
+        """
+        Same as Maze.wall_leaf_neighbours_id, from the junctions
+        """
+        junctions = self.junctions
+        wall_neighbours = self.__maze.grid.wall_neighbours
+        full = 1 if self.__maze.get_wall_id(wall_id) else 0
+        res = []
+        for start, corner in zip(
+            (6 * wall_id, 6 * wall_id + 3), self.corners(wall_id)
+        ):
+            if junctions[corner] == full:
+                res += [e for e in wall_neighbours[start:start + 3] if e != -1]
+        return res
+
+    def any_impass(self, walls: Iterable[int], const: bytearray) -> bool:
+        """
+        Returns whether any of the given walls is full, not marked in const,
+        and causes an impass, all at once through NumPy masks if it is
+        installed, the walls out of bounds being skipped
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            return any(
+                wall >= 0
+                and not const[wall]
+                and self.__maze.get_wall_id(wall)
+                and self.causes_impass(wall)
+                for wall in walls
+            )
+        ids = np.fromiter(walls, dtype=np.intp)
+        ids = ids[ids >= 0]
+        if len(ids) == 0:
+            return False
+        degrees = np.frombuffer(self.degrees, dtype=np.uint8)
+        cells = np.frombuffer(
+            self.__maze.grid.wall_cells, dtype=np.intc
+        ).reshape(-1, 2)[ids]
+        flags = np.frombuffer(self.__maze.storage.flags(), dtype=np.uint8)
+        mask = (
+            (flags[ids] != 0)
+            & (np.frombuffer(const, dtype=np.uint8)[ids] == 0)
+            & (degrees[cells].max(axis=1) >= 3)
+        )
+        return bool(mask.any())
 
-    def clear(self) -> Randset[WallCoord]:
+    def clear(self) -> Randset[int]:
         """
         Clears the current set of dirty walls and returns it
         """
@@ -32,7 +249,7 @@ class PacmanTracker:
         self.__dirty = Randset()
         return res
 
-    def curr_dirty(self) -> Iterable[WallCoord]:
+    def curr_dirty(self) -> Iterable[int]:
         """
         Returns an iterator over the currently dirty elements
         """
@@ -42,4 +259,4 @@ class PacmanTracker:
         """
         Removes this tracker's observer from the maze
         """
-        self.__maze.observers.discard(self.__observer)
+        self.__maze.batch_observers.discard(self.__observer)
@@ -1,87 +1,187 @@
-from dataclasses import dataclass
+from array import array
+from collections import deque
 from mazegen.maze.maze import Maze
-from mazegen.utils.coords import Cardinal, CellCoord
+from mazegen.utils.coords import Cardinal, Orientation, WallCoord
 from mazegen.utils.ivec2 import IVec2
 import heapq
 
 
-def taxicab_distance(a: IVec2, b: IVec2) -> int:
+class PathGrid:
     """
-    Returns the taxicab/manhattan distance between two points
+    The cells of a maze as integer indices, y * width + x, along with their
+    open neighbours, read straight from the wall bytes of its storage
     """
-    return sum(a.with_op(lambda lhs, rhs: abs(lhs - rhs), b).xy())
 
+    def __init__(self, maze: Maze) -> None:
+        self.width: int = maze.dims.x
+        self.height: int = maze.dims.y
+        self.size: int = self.width * self.height
+        self.__walls: bytearray = maze.storage.flags()
+        self.__horizontal_count: int = maze.storage.horizontal_count
 
-type LinkPath = None | tuple[Cardinal, LinkPath]
+    def index(self, cell: IVec2) -> int | None:
+        """
+        Returns the index of the given cell, or None if it is out of bounds
+        """
+        if 0 <= cell.x < self.width and 0 <= cell.y < self.height:
+            return cell.y * self.width + cell.x
+        return None
 
+    def neighbours(self, idx: int) -> list[int]:
+        """
+        Returns the indices of the cells reachable from the given one, in the
+        order north, south, east, west
+        """
+        width = self.width
+        walls = self.__walls
+        west = self.__horizontal_count + idx + idx // width
+        res = []
+        if idx >= width and not walls[idx]:
+            res.append(idx - width)
+        if idx + width < self.size and not walls[idx + width]:
+            res.append(idx + width)
+        x = idx % width
+        if x + 1 < width and not walls[west + 1]:
+            res.append(idx + 1)
+        if x > 0 and not walls[west]:
+            res.append(idx - 1)
+        return res
 
-@dataclass(slots=True)
-class AStarStep:
-    """
-    A step in A* pathfinding, containing the previously traversed path as
-    well as distance heuristics for the grid
-    """
+    def wall_cells(self, wall: WallCoord) -> tuple[int, int] | None:
+        """
+        Returns the indices of the two cells on each side of the wall, or None
+        if it does not lie between two cells of the maze
+        """
+        width = self.width
+        a = wall.a
+        b = wall.b
+        if wall.orientation is Orientation.HORIZONTAL:
+            if 0 < a < self.height and 0 <= b < width:
+                return ((a - 1) * width + b, a * width + b)
+        elif 0 < a < width and 0 <= b < self.height:
+            return (b * width + a - 1, b * width + a)
+        return None
 
-    dst: CellCoord
-    path: LinkPath
-    path_length: int
-    min_distance: int
+    def direction(self, prev: int, curr: int) -> Cardinal:
+        """
+        Returns the direction to go from a cell to a neighbouring one
+        """
+        if curr - prev == self.width:
+            return Cardinal.SOUTH
+        if prev - curr == self.width:
+            return Cardinal.NORTH
+        if curr - prev == 1:
+            return Cardinal.EAST
+        return Cardinal.WEST
 
-    def __lt__(self, other: "AStarStep") -> bool:
-        return self.min_distance < other.min_distance or (
-            self.min_distance == other.min_distance
-            and self.path_length > other.path_length
-        )
+    def distances(self, src: int) -> array[int]:
+        """
+        Returns the distance of every cell from src through a breadth first
+        search, -1 for the unreachable ones
+        """
+        res = array("i", [-1]) * self.size
+        res[src] = 0
+        queue = deque([src])
+        while len(queue) > 0:
+            curr = queue.popleft()
+            dist = res[curr] + 1
+            for nxt in self.neighbours(curr):
+                if res[nxt] == -1:
+                    res[nxt] = dist
+                    queue.append(nxt)
+        return res
 
-    def append(self, card: Cardinal, dst: CellCoord) -> "AStarStep":
+    def descend(self, distances: array[int], dst: int) -> list[Cardinal]:
         """
-        Adds the current direction to the path and returns it, with target
-        coord dst
+        Walks down the distances from dst to the cell at distance zero, and
+        returns the path to dst as a list of cardinal directions
         """
-        next_dst = self.dst.get_neighbour(card)
-        next_path = (card, self.path)
-        next_dist = self.path_length + 1
-        next_min_dist = next_dist + taxicab_distance(next_dst, dst)
-        return AStarStep(next_dst, next_path, next_dist, next_min_dist)
+        res = []
+        curr = dst
+        while distances[curr] > 0:
+            dist = distances[curr] - 1
+            prev = next(
+                nxt for nxt in self.neighbours(curr) if distances[nxt] == dist
+            )
+            res.append(self.direction(prev, curr))
+            curr = prev
+        res.reverse()
+        return res
 
-    def ends_in_bounds(self, maze: Maze) -> bool:
+    def distance(self, a: int, b: int) -> int:
         """
-        Checks whether this step ends within the maze
+        Returns the taxicab/manhattan distance between two cells
         """
-        return maze.check_cell(self.dst)
+        ay, ax = divmod(a, self.width)
+        by, bx = divmod(b, self.width)
+        return abs(ax - bx) + abs(ay - by)
 
-    def to_path(self) -> list[Cardinal]:
+    def to_path(self, parents: array[int], dst: int) -> list[Cardinal]:
         """
-        Turns this step to a path as a list of cardinal directions
+        Walks back the parents from dst up to the cell which is its own
+        parent, and returns the path to dst as a list of cardinal directions
         """
-        curr = self.path
         res = []
-        while curr is not None:
-            res.append(curr[0])
-            curr = curr[1]
+        curr = dst
+        while parents[curr] != curr:
+            prev = parents[curr]
+            res.append(self.direction(prev, curr))
+            curr = prev
         res.reverse()
         return res
 
 
+def pathfind_bfs(maze: Maze) -> list[Cardinal] | None:
+    """
+    Finds the shortest path between the entrance and exit using a breadth
+    first search over cell indices
+    """
+    grid = PathGrid(maze)
+    src = grid.index(maze.entry)
+    dst = grid.index(maze.exit)
+    if src is None or dst is None:
+        return None
+    parents = array("i", [-1]) * grid.size
+    parents[src] = src
+    queue = deque([src])
+    while len(queue) > 0:
+        curr = queue.popleft()
+        if curr == dst:
+            return grid.to_path(parents, dst)
+        for nxt in grid.neighbours(curr):
+            if parents[nxt] == -1:
+                parents[nxt] = curr
+                queue.append(nxt)
+    return None
+
+
 def pathfind_astar(maze: Maze) -> list[Cardinal] | None:
     """
-    Finds the shortest path between the entrance and exit using A*
+    Finds the shortest path between the entrance and exit using A* over cell
+    indices, preferring the longest paths among equally promising ones
     """
-    src = maze.entry
-    dst = maze.exit
-    queue = [AStarStep(src, None, 0, taxicab_distance(src, dst))]
-    heapq.heapify(queue)
-    visited = {src}
+    grid = PathGrid(maze)
+    src = grid.index(maze.entry)
+    dst = grid.index(maze.exit)
+    if src is None or dst is None:
+        return None
+    parents = array("i", [-1]) * grid.size
+    distances = array("i", [-1]) * grid.size
+    parents[src] = src
+    distances[src] = 0
+    queue = [(grid.distance(src, dst), 0, src)]
     while len(queue) > 0:
-        curr = heapq.heappop(queue)
-        if curr.dst == dst:
-            return curr.to_path()
-        for card in Cardinal.all():
-            if maze.get_wall(curr.dst.get_wall(card)):
-                continue
-            nxt = curr.append(card, dst)
-            if nxt.dst in visited or not nxt.ends_in_bounds(maze):
-                continue
-            visited.add(nxt.dst)
-            heapq.heappush(queue, nxt)
+        _, neg_dist, curr = heapq.heappop(queue)
+        if -neg_dist != distances[curr]:
+            continue
+        if curr == dst:
+            return grid.to_path(parents, dst)
+        dist = distances[curr] + 1
+        for nxt in grid.neighbours(curr):
+            if distances[nxt] == -1 or dist < distances[nxt]:
+                parents[nxt] = curr
+                distances[nxt] = dist
+                heapq.heappush(
+                    queue, (dist + grid.distance(nxt, dst), -dist, nxt)
+                )
     return None
@@ -0,0 +1,102 @@
+from array import array
+from mazegen.maze.maze import Maze
+from mazegen.maze.network_tracker import NetworkTracker
+from mazegen.maze.path import PathGrid
+from mazegen.utils.coords import Cardinal
+import heapq
+
+
+def wall_corners(maze: Maze) -> bytes:
+    """
+    Returns one byte per corner between cells, y * (width + 1) + x, non
+    zero if a full wall touches it
+    The horizontal walls are laid out line by line padded to one byte per
+    corner, such that each touches the corner at its index and the next
+    one, as each vertical wall touches the corners at its index and one
+    row below, and the planes are shifted and merged as integers
+    """
+    width, height = maze.dims.xy()
+    walls = maze.storage.flags()
+    horizontal_count = maze.storage.horizontal_count
+    size = (height + 1) * (width + 1)
+    padded = bytearray(size)
+    for a in range(height + 1):
+        padded[a * (width + 1):a * (width + 1) + width] = walls[
+            a * width:(a + 1) * width
+        ]
+    horizontal = int.from_bytes(padded, "little")
+    vertical = int.from_bytes(walls[horizontal_count:], "little")
+    res = (
+        horizontal
+        | horizontal << 8
+        | vertical
+        | vertical << (8 * (width + 1))
+    )
+    return res.to_bytes(size + width + 1, "little")[:size]
+
+
+def pathfind_pruned(
+    maze: Maze, tracker: NetworkTracker
+) -> list[Cardinal] | None:
+    """
+    Finds the shortest path between the entrance and exit using A* over cell
+    indices, as pathfind_astar, skipping the regions which cannot lead to
+    the exit, as told by the contours of the given tracker of the maze
+
+    The search stops at once if the entrance and exit are in different
+    regions, and it never steps through an open wall which, if filled,
+    would enclose a region whose bounding box, read from the bounding
+    volumes of its contour, does not hold the exit: such a region is only
+    reached through that wall, so no shortest path enters it
+    Such a wall must touch full walls at both ends, which is first checked
+    on the corners, see wall_corners, before looking the contours up
+    The tracker must keep its contours with bounds, see
+    NetworkTracker.cut_off
+    """
+    grid = PathGrid(maze)
+    src = grid.index(maze.entry)
+    dst = grid.index(maze.exit)
+    if src is None or dst is None:
+        return None
+    if tracker.region(maze.entry) != tracker.region(maze.exit):
+        return None
+    cell = maze.grid.cell
+    corners = wall_corners(maze)
+    width = grid.width
+    dst_x, dst_y = maze.exit.x, maze.exit.y
+    parents = array("i", [-1]) * grid.size
+    distances = array("i", [-1]) * grid.size
+    parents[src] = src
+    distances[src] = 0
+    queue = [(grid.distance(src, dst), 0, src)]
+    while len(queue) > 0:
+        _, neg_dist, curr = heapq.heappop(queue)
+        if -neg_dist != distances[curr]:
+            continue
+        if curr == dst:
+            return grid.to_path(parents, dst)
+        dist = distances[curr] + 1
+        for nxt in grid.neighbours(curr):
+            if distances[nxt] != -1 and dist >= distances[nxt]:
+                continue
+            # The corners at each end of the wall between them
+            if nxt - curr == width or curr - nxt == width:
+                corner = max(curr, nxt) + max(curr, nxt) // width
+                other = corner + 1
+            else:
+                corner = max(curr, nxt) + curr // width
+                other = corner + width + 1
+            rect = (
+                tracker.cut_off((cell(nxt), grid.direction(nxt, curr)))
+                if corners[corner] != 0 and corners[other] != 0
+                else None
+            )
+            if rect is not None and not (
+                rect[0].x <= dst_x < rect[1].x
+                and rect[0].y <= dst_y < rect[1].y
+            ):
+                continue
+            parents[nxt] = curr
+            distances[nxt] = dist
+            heapq.heappush(queue, (dist + grid.distance(nxt, dst), -dist, nxt))
+    return None
@@ -0,0 +1,164 @@
+from array import array
+from collections import deque
+from mazegen.maze.maze import Maze
+from mazegen.maze.path import PathGrid
+from mazegen.utils import Cardinal, CellCoord, WallCoord
+import heapq
+
+
+class PathTracker:
+    """
+    A tracker which keeps the distance of every cell from the entry of the
+    maze, such that the shortest path to the exit may be walked down from it
+
+    The walls changed since the last query are only applied on the next one,
+    repairing the distances around them rather than searching the whole maze
+    again: the cells which lost their every shortest connection have their
+    distance searched again from their neighbours, then the cells which got
+    a shorter connection have it propagated
+    It observes every wall, which are delivered before batches, such that it
+    is up to date from within batch observers
+    """
+
+    def __init__(self, maze: Maze) -> None:
+        self.__maze: Maze = maze
+        self.__dirty: set[WallCoord] = set()
+        self.__src: CellCoord | None = None
+        self.__distances: array[int] = array("i")
+        maze.observers.add(self.__observer)
+
+    def __observer(self, wall: WallCoord) -> None:
+        if wall in self.__dirty:
+            self.__dirty.remove(wall)
+        else:
+            self.__dirty.add(wall)
+
+    def fork(self, maze: Maze) -> "PathTracker":
+        """
+        Returns a tracker of the given fork of the tracked maze, see
+        Maze.fork, with the same distances and changed walls
+        """
+        res = PathTracker(maze)
+        res.__dirty = set(self.__dirty)
+        res.__src = self.__src
+        res.__distances = self.__distances[:]
+        return res
+
+    def path(self) -> list[Cardinal] | None:
+        """
+        Returns the shortest path from the entry to the exit, or None if there
+        is none
+        """
+        grid = PathGrid(self.__maze)
+        src = grid.index(self.__maze.entry)
+        dst = grid.index(self.__maze.exit)
+        if src is None or dst is None:
+            return None
+        dirty = self.__dirty
+        self.__dirty = set()
+        if self.__src != self.__maze.entry or len(dirty) * 4 > grid.size:
+            self.__src = self.__maze.entry
+            self.__distances = grid.distances(src)
+        else:
+            self.__repair(grid, dirty)
+        if self.__distances[dst] == -1:
+            return None
+        return grid.descend(self.__distances, dst)
+
+    def __repair(self, grid: PathGrid, dirty: set[WallCoord]) -> None:
+        """
+        Repairs the distances for the given changed walls
+        """
+        filled: list[tuple[int, int]] = []
+        emptied: list[tuple[int, int]] = []
+        for wall in dirty:
+            cells = grid.wall_cells(wall)
+            if cells is not None:
+                if self.__maze.get_wall(wall):
+                    filled.append(cells)
+                else:
+                    emptied.append(cells)
+        self.__repair_filled(grid, filled)
+        self.__repair_emptied(grid, emptied)
+
+    def __repair_filled(
+        self, grid: PathGrid, filled: list[tuple[int, int]]
+    ) -> None:
+        """
+        Searches again the distances of the cells which lost all of their
+        shortest connections, layer by layer from the closest ones
+        As the new connections are already there, this may shorten the
+        distance of other cells too
+        """
+        dist = self.__distances
+        queue: list[tuple[int, int]] = []
+        for a, b in filled:
+            if dist[a] != -1 and dist[b] == dist[a] + 1:
+                queue.append((dist[b], b))
+            elif dist[b] != -1 and dist[a] == dist[b] + 1:
+                queue.append((dist[a], a))
+        heapq.heapify(queue)
+
+        seen: set[int] = set()
+        affected: set[int] = set()
+        while len(queue) > 0:
+            d, cell = heapq.heappop(queue)
+            if cell in seen:
+                continue
+            seen.add(cell)
+            neighbours = grid.neighbours(cell)
+            if any(
+                dist[nxt] == d - 1 and nxt not in affected
+                for nxt in neighbours
+            ):
+                continue
+            affected.add(cell)
+            for nxt in neighbours:
+                if dist[nxt] == d + 1:
+                    heapq.heappush(queue, (d + 1, nxt))
+
+        for cell in affected:
+            dist[cell] = -1
+        for cell in affected:
+            reached = [dist[nxt] for nxt in grid.neighbours(cell)]
+            best = min((d for d in reached if d != -1), default=-1)
+            if best != -1:
+                queue.append((best + 1, cell))
+        heapq.heapify(queue)
+        while len(queue) > 0:
+            d, cell = heapq.heappop(queue)
+            if dist[cell] != -1 and dist[cell] <= d:
+                continue
+            dist[cell] = d
+            for nxt in grid.neighbours(cell):
+                if dist[nxt] == -1 or dist[nxt] > d + 1:
+                    heapq.heappush(queue, (d + 1, nxt))
+
+    def __repair_emptied(
+        self, grid: PathGrid, emptied: list[tuple[int, int]]
+    ) -> None:
+        """
+        Propagates the shorter distances through the new connections
+        """
+        dist = self.__distances
+        queue: deque[int] = deque()
+        for a, b in emptied:
+            for src, dst in ((a, b), (b, a)):
+                if dist[src] != -1 and (
+                    dist[dst] == -1 or dist[dst] > dist[src] + 1
+                ):
+                    dist[dst] = dist[src] + 1
+                    queue.append(dst)
+        while len(queue) > 0:
+            cell = queue.popleft()
+            d = dist[cell] + 1
+            for nxt in grid.neighbours(cell):
+                if dist[nxt] == -1 or dist[nxt] > d:
+                    dist[nxt] = d
+                    queue.append(nxt)
+
+    def end(self) -> None:
+        """
+        Remove this tracker from the observers of the maze
+        """
+        self.__maze.observers.discard(self.__observer)
@@ -1,4 +1,4 @@
-from collections.abc import Iterable, Generator, Callable
+from collections.abc import Iterable, Iterator, Generator, Callable
 from mazegen.utils import IVec2, CellCoord
 from mazegen.maze import Maze
 
@@ -68,6 +68,12 @@ class Pattern:
                 break
         return Pattern(full - reachable)
 
+    def cells(self) -> Iterator[CellCoord]:
+        """
+        Returns an iterator over the cells of the pattern
+        """
+        return iter(self.__cells)
+
     def add_cell(self, cell: CellCoord) -> None:
         """
         Adds a cell to the pattern
@@ -143,8 +149,8 @@ class Pattern:
     def write_to_maze(self, maze: "Maze") -> None:
         """
         Writes the pattern into the maze by filling the walls of each pattern
-        cell
+        cell, as a single batch
         """
-        for cell in self.__cells:
-            for wall in cell.walls():
-                maze.set_wall(wall, True)
+        maze.set_walls(
+            (wall for cell in self.__cells for wall in cell.walls()), True
+        )
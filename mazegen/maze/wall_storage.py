@@ -0,0 +1,328 @@
+from abc import ABC, abstractmethod
+from collections.abc import Buffer, Iterator
+from mazegen.utils import IVec2, Orientation, WallCoord
+from weakref import WeakSet
+
+NONZERO_TO_ONE = bytes([0]) + bytes([1]) * 255
+
+
+class WallStorage(ABC):
+    """
+    The storage of the filled walls of a maze
+
+    Every wall within the bounds of the maze has a dense index, first the
+    horizontal walls, line by line, then the vertical walls, row by row, such
+    that the walls of a row of cells are contiguous in each plane
+    """
+
+    def __init__(self, dims: IVec2) -> None:
+        self.dims: IVec2 = dims
+        self.width: int = dims.x
+        self.height: int = dims.y
+        self.horizontal_count: int = (dims.y + 1) * dims.x
+        self.vertical_count: int = dims.y * (dims.x + 1)
+
+    def __len__(self) -> int:
+        return self.horizontal_count + self.vertical_count
+
+    def index(self, wall: WallCoord) -> int | None:
+        """
+        Returns the dense index of the given wall, or None if it is out of
+        bounds
+        """
+        a = wall.a
+        b = wall.b
+        if wall.orientation is Orientation.HORIZONTAL:
+            if 0 <= a <= self.height and 0 <= b < self.width:
+                return a * self.width + b
+            return None
+        if 0 <= a <= self.width and 0 <= b < self.height:
+            return self.horizontal_count + b * (self.width + 1) + a
+        return None
+
+    def wall(self, idx: int) -> WallCoord:
+        """
+        Returns the wall for the given dense index
+        """
+        if idx < self.horizontal_count:
+            a, b = divmod(idx, self.width)
+            return WallCoord(Orientation.HORIZONTAL, a, b)
+        b, a = divmod(idx - self.horizontal_count, self.width + 1)
+        return WallCoord(Orientation.VERTICAL, a, b)
+
+    @abstractmethod
+    def get_index(self, idx: int) -> bool:
+        """
+        Returns whether the wall at the given index is filled in
+        """
+
+    @abstractmethod
+    def set_index(self, idx: int, value: bool) -> None:
+        """
+        Sets whether the wall at the given index is filled in
+        """
+
+    @abstractmethod
+    def full_indices(self) -> Iterator[int]:
+        """
+        Returns an iterator over the indices of the filled walls, in
+        arbitrary order
+        """
+
+    def empty_indices(self) -> Iterator[int]:
+        """
+        Returns an iterator over the indices of the empty walls, in
+        increasing order
+        The iterator is still valid after a wall has been altered, if it
+        was filled it shall not be yielded
+        """
+        return (idx for idx in range(len(self)) if not self.get_index(idx))
+
+    def get_wall(self, wall: WallCoord) -> bool:
+        """
+        Returns whether said wall is filled in, out of bounds walls never are
+        """
+        idx = self.index(wall)
+        return idx is not None and self.get_index(idx)
+
+    def set_wall(self, wall: WallCoord, value: bool) -> None:
+        """
+        Sets whether said wall is filled in, raises if it is out of bounds
+        """
+        idx = self.index(wall)
+        if idx is None:
+            raise Exception(
+                f"Wall {wall.orientation.name} {wall.a}, {wall.b} "
+                + "out of bounds of the maze"
+            )
+        self.set_index(idx, value)
+
+    def replace(self, wall: WallCoord, value: bool) -> bool:
+        """
+        Sets whether said wall is filled in, returns whether it changed
+        Raises if it is out of bounds
+        """
+        if self.get_wall(wall) == value:
+            return False
+        self.set_wall(wall, value)
+        return True
+
+    def walls_full(self) -> Iterator[WallCoord]:
+        """
+        Returns an iterator over the filled walls
+        The iterator is only valid as long as the walls don't change
+        """
+        return map(self.wall, self.full_indices())
+
+    def flags(self) -> bytearray:
+        """
+        Returns one byte per wall, by dense index, non zero if it is filled
+        in, which is not to be modified
+        """
+        res = bytearray(len(self))
+        for idx in self.full_indices():
+            res[idx] = 1
+        return res
+
+    def load_flags(self, flags: Buffer) -> None:
+        """
+        Sets every wall at once from one byte per wall, by dense index, as
+        returned by flags
+        """
+        values = bytes(flags)
+        if len(values) != len(self):
+            raise Exception(
+                f"Expected {len(self)} walls, got {len(values)} instead"
+            )
+        for idx, value in enumerate(values):
+            self.set_index(idx, value != 0)
+
+    def fork(self) -> "WallStorage":
+        """
+        Returns a storage of the same walls, which changes independently of
+        this one
+        """
+        res = type(self)(self.dims)
+        res.load_flags(self.flags())
+        return res
+
+
+class DictWallStorage(WallStorage):
+    """
+    A storage which keeps the filled walls as keys of a dict, in the order
+    they were filled in
+    """
+
+    def __init__(self, dims: IVec2) -> None:
+        super().__init__(dims)
+        self.__walls_full: dict[WallCoord, None] = {}
+
+    def get_index(self, idx: int) -> bool:
+        return self.wall(idx) in self.__walls_full
+
+    def set_index(self, idx: int, value: bool) -> None:
+        self.set_wall(self.wall(idx), value)
+
+    def full_indices(self) -> Iterator[int]:
+        for wall in self.__walls_full:
+            idx = self.index(wall)
+            if idx is not None:
+                yield idx
+
+    def get_wall(self, wall: WallCoord) -> bool:
+        return wall in self.__walls_full
+
+    def set_wall(self, wall: WallCoord, value: bool) -> None:
+        if self.index(wall) is None:
+            raise Exception(
+                f"Wall {wall.orientation.name} {wall.a}, {wall.b} "
+                + "out of bounds of the maze"
+            )
+        if value:
+            self.__walls_full[wall] = None
+        else:
+            self.__walls_full.pop(wall, None)
+
+    def walls_full(self) -> Iterator[WallCoord]:
+        return iter(self.__walls_full)
+
+    def fork(self) -> "DictWallStorage":
+        res = DictWallStorage(self.dims)
+        res.__walls_full = dict(self.__walls_full)
+        return res
+
+
+class ArrayWallStorage(WallStorage):
+    """
+    A compact storage which keeps one byte per wall of the maze, indexed by
+    the dense wall index, holding one if the wall is filled in
+
+    Forks share the bytes of the storage they were made from until either
+    side changes a wall, at which point the forks copy them, such that the
+    bytes of the original storage, as returned by flags, stay the same
+    object
+    """
+
+    def __init__(self, dims: IVec2) -> None:
+        super().__init__(dims)
+        self.data: bytearray = bytearray(len(self))
+        self.__shared: bool = False
+        self.__source: ArrayWallStorage | None = None
+        self.__forks: WeakSet[ArrayWallStorage] = WeakSet()
+
+    def __getstate__(self) -> dict[str, object]:
+        """
+        Pickles the walls alone, forks being bound to this process
+        """
+        state = self.__dict__.copy()
+        for key in ("__shared", "__source", "__forks"):
+            del state[f"_ArrayWallStorage{key}"]
+        return state
+
+    def __setstate__(self, state: dict[str, object]) -> None:
+        """
+        Unpickles the walls as bytes of its own, shared with no other
+        storage
+        """
+        self.__dict__.update(state)
+        self.data = bytearray(self.data)
+        self.__shared = False
+        self.__source = None
+        self.__forks = WeakSet()
+
+    def __own(self) -> None:
+        """
+        Stops sharing bytes with any other storage, before a change
+        """
+        source = self.__source
+        if source is not None:
+            self.data = bytearray(self.data)
+            source.__forks.discard(self)
+            source.__shared = len(source.__forks) != 0
+            self.__source = None
+        for fork in list(self.__forks):
+            fork.__own()
+        self.__shared = False
+
+    def get_index(self, idx: int) -> bool:
+        return self.data[idx] != 0
+
+    def set_index(self, idx: int, value: bool) -> None:
+        if self.__shared:
+            self.__own()
+        self.data[idx] = 1 if value else 0
+
+    def replace(self, wall: WallCoord, value: bool) -> bool:
+        idx = self.index(wall)
+        if idx is None:
+            return super().replace(wall, value)
+        byte = 1 if value else 0
+        if self.data[idx] == byte:
+            return False
+        if self.__shared:
+            self.__own()
+        self.data[idx] = byte
+        return True
+
+    def fork(self) -> "ArrayWallStorage":
+        """
+        Returns a storage of the same walls sharing the bytes of this one
+        until either changes, in O(1)
+        """
+        source = self.__source if self.__source is not None else self
+        # Made empty then given the dims, not to allocate bytes of its own
+        res = ArrayWallStorage(IVec2(0, 0))
+        WallStorage.__init__(res, self.dims)
+        res.data = self.data
+        res.__source = source
+        res.__shared = True
+        source.__forks.add(res)
+        source.__shared = True
+        return res
+
+    def full_indices(self) -> Iterator[int]:
+        idx = self.data.find(1)
+        while idx != -1:
+            yield idx
+            idx = self.data.find(1, idx + 1)
+
+    def empty_indices(self) -> Iterator[int]:
+        idx = self.data.find(0)
+        while idx != -1:
+            yield idx
+            idx = self.data.find(0, idx + 1)
+
+    def flags(self) -> bytearray:
+        return self.data
+
+    def own_flags(self) -> bytearray:
+        """
+        Returns the bytes of the storage, first copied if they are shared
+        with the storage this one was forked from, such that they stay its
+        bytes through later changes
+        """
+        if self.__source is not None:
+            self.__own()
+        return self.data
+
+    def load_flags(self, flags: Buffer) -> None:
+        values = bytes(flags)
+        if len(values) != len(self):
+            raise Exception(
+                f"Expected {len(self)} walls, got {len(values)} instead"
+            )
+        if self.__shared:
+            self.__own()
+        self.data[:] = values.translate(NONZERO_TO_ONE)
+
+    def horizontal(self) -> memoryview:
+        """
+        Returns the plane of horizontal walls, line by line
+        """
+        return memoryview(self.data)[: self.horizontal_count]
+
+    def vertical(self) -> memoryview:
+        """
+        Returns the plane of vertical walls, row by row
+        """
+        return memoryview(self.data)[self.horizontal_count:]
@@ -9,6 +9,12 @@ from .quadtree import Tree as QuadTree, Rect
 from .ivec2 import IVec2
 from .coords import Cardinal, Orientation, WallCoord, CellCoord, SplitWall
 from .randset import Randset
+from .disjoint_set import DisjointSet
+from .rng import ModuleRandom, resolve_rng
+from .grid import Grid
+from .sequence_forest import SequenceForest, TreeSequenceForest
+from .array_avl import ArrayAVL
+from .gc_policy import GCPolicy
 
 __all__ = [
     "BiMap",
@@ -25,4 +31,12 @@ __all__ = [
     "CellCoord",
     "SplitWall",
     "Randset",
+    "DisjointSet",
+    "ModuleRandom",
+    "resolve_rng",
+    "Grid",
+    "SequenceForest",
+    "TreeSequenceForest",
+    "ArrayAVL",
+    "GCPolicy",
 ]
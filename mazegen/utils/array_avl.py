@@ -0,0 +1,549 @@
+from array import array
+from collections.abc import Iterator
+from typing import cast
+
+from mazegen.utils.coords import SplitWall
+from mazegen.utils.ivec2 import IVec2
+from mazegen.utils.quadtree import Rect
+from mazegen.utils.sequence_forest import SequenceForest, contour_order
+
+# The bounds of contour_order once packed in an int, see ArrayAVL.order_of
+ORDER_BITS = 24
+ORDER_MAX = (1 << 63) - 1
+COORD_MAX = (1 << 31) - 1
+
+
+class ArrayAVL(SequenceForest[int, int]):
+    """
+    A forest of AVL trees ordered by position only, with one node per
+    element, kept in parallel integer columns rather than in objects
+    Both handles and trees are node indices, a tree being its root node,
+    the node 0 standing for none, such as the empty tree, its parent being
+    meaningless
+    Removed nodes are kept in a free list and reused, the columns never
+    shrink, and no cycle is ever left to the garbage collector
+    Every operation is iterative: split and join walk up the parent column,
+    and root is a plain loop
+    The key columns are the node of the least value in each subtree, see
+    least, and, if bounds is set, the bounding box of the cells of each
+    subtree, see span, the westmost column of a box being that of its least
+    value, which is left out by default as it slows every update down
+    """
+
+    def __init__(self, bounds: bool = False) -> None:
+        self.bounds: bool = bounds
+        self.__parent: array[int] = array("i", [0])
+        self.__left: array[int] = array("i", [0])
+        self.__right: array[int] = array("i", [0])
+        self.__height: array[int] = array("i", [0])
+        self.__least: array[int] = array("i", [0])
+        self.__order: array[int] = array("q", [ORDER_MAX])
+        self.__values: list[SplitWall | None] = [None]
+        self.__x: array[int] = array("i", [COORD_MAX])
+        self.__y: array[int] = array("i", [COORD_MAX])
+        self.__min_y: array[int] = array("i", [COORD_MAX])
+        self.__max_x: array[int] = array("i", [-COORD_MAX])
+        self.__max_y: array[int] = array("i", [-COORD_MAX])
+        self.__free: list[int] = []
+
+    def __len__(self) -> int:
+        """
+        Returns the number of elements in the whole forest
+        """
+        return len(self.__parent) - 1 - len(self.__free)
+
+    def copy(self) -> "ArrayAVL":
+        """
+        Returns a forest of the same trees, under the same node indices, by
+        copying every column at once
+        """
+        res = ArrayAVL(self.bounds)
+        res.__parent = self.__parent[:]
+        res.__left = self.__left[:]
+        res.__right = self.__right[:]
+        res.__height = self.__height[:]
+        res.__least = self.__least[:]
+        res.__order = self.__order[:]
+        res.__values = self.__values[:]
+        res.__x = self.__x[:]
+        res.__y = self.__y[:]
+        res.__min_y = self.__min_y[:]
+        res.__max_x = self.__max_x[:]
+        res.__max_y = self.__max_y[:]
+        res.__free = self.__free[:]
+        return res
+
+    @staticmethod
+    def order_of(value: SplitWall) -> int:
+        """
+        Packs the contour_order of a value in a single int, coordinates
+        being expected to lie within ORDER_BITS bits
+        """
+        x, side, y = contour_order(value)
+        offset = 1 << (ORDER_BITS - 1)
+        return (((x + offset) << 1 | side) << ORDER_BITS) | (y + offset)
+
+    def __new_node(self, value: SplitWall) -> int:
+        """
+        Makes a detached node of the given value, reusing a removed one if
+        there is any
+        """
+        if len(self.__free) != 0:
+            node = self.__free.pop()
+            self.__height[node] = 1
+            self.__least[node] = node
+            self.__order[node] = self.order_of(value)
+            self.__values[node] = value
+            self.__x[node] = self.__max_x[node] = value[0].x
+            self.__y[node] = self.__min_y[node] = self.__max_y[node] = (
+                value[0].y
+            )
+            return node
+        node = len(self.__parent)
+        self.__parent.append(0)
+        self.__left.append(0)
+        self.__right.append(0)
+        self.__height.append(1)
+        self.__least.append(node)
+        self.__order.append(self.order_of(value))
+        self.__values.append(value)
+        self.__x.append(value[0].x)
+        self.__y.append(value[0].y)
+        self.__min_y.append(value[0].y)
+        self.__max_x.append(value[0].x)
+        self.__max_y.append(value[0].y)
+        return node
+
+    def __update(self, node: int) -> None:
+        """
+        Updates the height, least node and bounding box of a node from its
+        children
+        """
+        left = self.__left[node]
+        right = self.__right[node]
+        height = self.__height
+        height[node] = max(height[left], height[right]) + 1
+        least = self.__least
+        order = self.__order
+        res = node
+        if order[least[left]] < order[res]:
+            res = least[left]
+        if order[least[right]] < order[res]:
+            res = least[right]
+        least[node] = res
+        if not self.bounds:
+            return
+        res = self.__y[node]
+        lo = self.__min_y
+        if lo[left] < res:
+            res = lo[left]
+        if lo[right] < res:
+            res = lo[right]
+        lo[node] = res
+        res = self.__y[node]
+        hi = self.__max_y
+        if hi[left] > res:
+            res = hi[left]
+        if hi[right] > res:
+            res = hi[right]
+        hi[node] = res
+        res = self.__x[node]
+        hi = self.__max_x
+        if hi[left] > res:
+            res = hi[left]
+        if hi[right] > res:
+            res = hi[right]
+        hi[node] = res
+
+    def __replace_child(self, parent: int, node: int, by: int) -> None:
+        """
+        Replaces a node by another among the children of parent, if any
+        """
+        self.__parent[by] = parent
+        if parent == 0:
+            return
+        if self.__left[parent] == node:
+            self.__left[parent] = by
+        else:
+            self.__right[parent] = by
+
+    def __rotate_left(self, node: int) -> int:
+        """
+        Lifts up the right child of node, returns it
+        """
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+        up = right[node]
+        inner = left[up]
+        self.__replace_child(parent[node], node, up)
+        right[node] = inner
+        parent[inner] = node
+        left[up] = node
+        parent[node] = up
+        self.__update(node)
+        self.__update(up)
+        return up
+
+    def __rotate_right(self, node: int) -> int:
+        """
+        Lifts up the left child of node, returns it
+        """
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+        up = left[node]
+        inner = right[up]
+        self.__replace_child(parent[node], node, up)
+        left[node] = inner
+        parent[inner] = node
+        right[up] = node
+        parent[node] = up
+        self.__update(node)
+        self.__update(up)
+        return up
+
+    def __rebalance(self, node: int) -> int:
+        """
+        Updates a node and rotates it if it is unbalanced, returns the node
+        now in its place
+        """
+        left = self.__left
+        right = self.__right
+        height = self.__height
+        self.__update(node)
+        balance = height[right[node]] - height[left[node]]
+        if balance > 1:
+            child = right[node]
+            if height[left[child]] > height[right[child]]:
+                self.__rotate_right(child)
+            return self.__rotate_left(node)
+        if balance < -1:
+            child = left[node]
+            if height[right[child]] > height[left[child]]:
+                self.__rotate_left(child)
+            return self.__rotate_right(node)
+        return node
+
+    def __rebalance_up(self, node: int) -> int:
+        """
+        Rebalances every node from the given one up to its root, returns
+        the root
+        """
+        parent = self.__parent
+        while True:
+            node = self.__rebalance(node)
+            if parent[node] == 0:
+                return node
+            node = parent[node]
+
+    def __join_with(self, lhs: int, mid: int, rhs: int) -> int:
+        """
+        Concatenates two detached trees around a detached node, returns the
+        resulting tree
+        """
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+        height = self.__height
+        if height[lhs] > height[rhs] + 1:
+            above = lhs
+            curr = right[lhs]
+            while height[curr] > height[rhs] + 1:
+                above = curr
+                curr = right[curr]
+            right[above] = mid
+            parent[mid] = above
+            left[mid] = curr
+            parent[curr] = mid
+            right[mid] = rhs
+            parent[rhs] = mid
+            return self.__rebalance_up(mid)
+        if height[rhs] > height[lhs] + 1:
+            above = rhs
+            curr = left[rhs]
+            while height[curr] > height[lhs] + 1:
+                above = curr
+                curr = left[curr]
+            left[above] = mid
+            parent[mid] = above
+            right[mid] = curr
+            parent[curr] = mid
+            left[mid] = lhs
+            parent[lhs] = mid
+            return self.__rebalance_up(mid)
+        left[mid] = lhs
+        right[mid] = rhs
+        parent[lhs] = mid
+        parent[rhs] = mid
+        parent[mid] = 0
+        self.__update(mid)
+        return mid
+
+    def __detach(self, node: int) -> tuple[int, int]:
+        """
+        Removes a node from its tree, returns the trees of the nodes left
+        and right of it
+        """
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+        lhs = left[node]
+        rhs = right[node]
+        parent[lhs] = 0
+        parent[rhs] = 0
+        child = node
+        curr = parent[node]
+        left[node] = 0
+        right[node] = 0
+        parent[node] = 0
+        while curr != 0:
+            above = parent[curr]
+            from_right = right[curr] == child
+            sibling = left[curr] if from_right else right[curr]
+            parent[sibling] = 0
+            left[curr] = 0
+            right[curr] = 0
+            parent[curr] = 0
+            if from_right:
+                lhs = self.__join_with(sibling, curr, lhs)
+            else:
+                rhs = self.__join_with(rhs, curr, sibling)
+            child = curr
+            curr = above
+        self.__update(node)
+        return (lhs, rhs)
+
+    def single(self, value: SplitWall) -> tuple[int, int]:
+        node = self.__new_node(value)
+        return (node, node)
+
+    def build(self, values: list[SplitWall]) -> tuple[list[int], int]:
+        nodes = [self.__new_node(value) for value in values]
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+
+        def make(lo: int, hi: int) -> int:
+            if lo == hi:
+                return 0
+            mid = (lo + hi) // 2
+            node = nodes[mid]
+            left[node] = make(lo, mid)
+            right[node] = make(mid + 1, hi)
+            parent[left[node]] = node
+            parent[right[node]] = node
+            self.__update(node)
+            return node
+
+        root = make(0, len(nodes))
+        parent[root] = 0
+        return (nodes, root)
+
+    def append(self, tree: int, value: SplitWall) -> tuple[int, int]:
+        node = self.__new_node(value)
+        return (node, self.__join_with(tree, node, 0))
+
+    def prepend(self, tree: int, value: SplitWall) -> tuple[int, int]:
+        node = self.__new_node(value)
+        return (node, self.__join_with(0, node, tree))
+
+    def join(self, lhs: int, rhs: int) -> int:
+        if lhs == 0:
+            return rhs
+        if rhs == 0:
+            return lhs
+        last = lhs
+        while self.__right[last] != 0:
+            last = self.__right[last]
+        lhs, _ = self.__detach(last)
+        return self.__join_with(lhs, last, rhs)
+
+    def split(self, handle: int) -> tuple[int, int]:
+        res = self.__detach(handle)
+        self.__values[handle] = None
+        self.__free.append(handle)
+        return res
+
+    def root(self, handle: int) -> int:
+        parent = self.__parent
+        while parent[handle] != 0:
+            handle = parent[handle]
+        return handle
+
+    def is_empty(self, tree: int) -> bool:
+        return tree == 0
+
+    def least(self, tree: int) -> SplitWall:
+        res = self.__values[self.__least[tree]]
+        if res is None:
+            raise Exception("Least operation on an empty tree")
+        return res
+
+    def __suffix(self, node: int, stop: int) -> tuple[list[int], list[int]]:
+        """
+        Returns the nodes, and the roots of the subtrees, which together
+        make the elements from the given node included up to the end of
+        stop's subtree, stop being an ancestor of node, or 0 for its root
+        """
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+        nodes = [node]
+        trees = [right[node]]
+        child, curr = node, parent[node]
+        while curr != stop:
+            if left[curr] == child:
+                nodes.append(curr)
+                trees.append(right[curr])
+            child, curr = curr, parent[curr]
+        return (nodes, trees)
+
+    def __prefix(self, node: int, stop: int) -> tuple[list[int], list[int]]:
+        """
+        Returns the nodes, and the roots of the subtrees, which together
+        make the elements from the start of stop's subtree up to the given
+        node excluded, stop being an ancestor of node, or 0 for its root
+        """
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+        nodes = []
+        trees = [left[node]]
+        child, curr = node, parent[node]
+        while curr != stop:
+            if right[curr] == child:
+                nodes.append(curr)
+                trees.append(left[curr])
+            child, curr = curr, parent[curr]
+        return (nodes, trees)
+
+    def __cover(self, first: int, last: int) -> tuple[list[int], list[int]]:
+        """
+        Returns the nodes, and the roots of the subtrees, which together
+        make the elements from first included to last excluded, wrapping
+        around the end of their tree, which is whole if they are the same
+        """
+        left = self.__left
+        right = self.__right
+        parent = self.__parent
+        if first == last:
+            return ([], [self.root(first)])
+        below: dict[int, int] = {first: 0}
+        child, curr = 0, first
+        while parent[curr] != 0:
+            child, curr = curr, parent[curr]
+            below[curr] = child
+        child, curr = 0, last
+        while curr not in below:
+            if curr == 0:
+                raise Exception("Span operation across trees")
+            child, curr = curr, parent[curr]
+        if curr == first:
+            before = right[curr] == child
+        else:
+            before = left[curr] == below[curr]
+        if not before:
+            nodes, trees = self.__suffix(first, 0)
+            more_nodes, more_trees = self.__prefix(last, 0)
+            return (nodes + more_nodes, trees + more_trees)
+        nodes, trees = [], []
+        if first != curr:
+            nodes, trees = self.__suffix(first, curr)
+        if last != curr:
+            nodes.append(curr)
+            more_nodes, more_trees = self.__prefix(last, curr)
+            nodes += more_nodes
+            trees += more_trees
+        return (nodes, trees)
+
+    def span(self, first: int, last: int) -> tuple[Rect, SplitWall]:
+        if not self.bounds:
+            raise Exception("Span operation without bounds")
+        nodes, trees = self.__cover(first, last)
+        order = self.__order
+        least = min(
+            nodes + [self.__least[tree] for tree in trees],
+            key=order.__getitem__,
+        )
+        value = self.__values[least]
+        if value is None:
+            raise Exception("Span operation on an empty range")
+        min_y = min(
+            [self.__y[node] for node in nodes]
+            + [self.__min_y[tree] for tree in trees]
+        )
+        max_x = max(
+            [self.__x[node] for node in nodes]
+            + [self.__max_x[tree] for tree in trees]
+        )
+        max_y = max(
+            [self.__y[node] for node in nodes]
+            + [self.__max_y[tree] for tree in trees]
+        )
+        return (
+            (IVec2(value[0].x, min_y), IVec2(max_x + 1, max_y + 1)),
+            value,
+        )
+
+    def values(self, tree: int) -> Iterator[SplitWall]:
+        """
+        Returns an iterator over the values of the given tree, breadth first
+        rather than in order, which is faster to walk
+        """
+        left = self.__left
+        right = self.__right
+        nodes = [tree] if tree != 0 else []
+        for node in nodes:
+            if left[node] != 0:
+                nodes.append(left[node])
+            if right[node] != 0:
+                nodes.append(right[node])
+        return cast(Iterator[SplitWall], map(self.__values.__getitem__, nodes))
+
+    def nodes(self, tree: int) -> Iterator[int]:
+        """
+        Yields the nodes of the given tree in order
+        """
+        stack: list[int] = []
+        curr = tree
+        while len(stack) != 0 or curr != 0:
+            while curr != 0:
+                stack.append(curr)
+                curr = self.__left[curr]
+            curr = stack.pop()
+            yield curr
+            curr = self.__right[curr]
+
+    def validate(self, tree: int) -> None:
+        """
+        Checks the links, heights, least nodes and balance of the given tree,
+        for debugging
+        """
+        for node in self.nodes(tree):
+            left = self.__left[node]
+            right = self.__right[node]
+            for child in (left, right):
+                if child != 0 and self.__parent[child] != node:
+                    raise Exception(f"Invalid parent link under node {node}")
+            if abs(self.__height[left] - self.__height[right]) > 1:
+                raise Exception(f"Unbalanced node {node}")
+            height = max(self.__height[left], self.__height[right]) + 1
+            least = min(
+                (self.__least[left], node, self.__least[right]),
+                key=self.__order.__getitem__,
+            )
+            if (
+                self.__height[node] != height
+                or self.__order[self.__least[node]] != self.__order[least]
+            ):
+                raise Exception(f"Stale key columns at node {node}")
+            if self.bounds and (
+                self.__min_y[node]
+                != min(self.__min_y[left], self.__y[node], self.__min_y[right])
+                or self.__max_x[node]
+                != max(self.__max_x[left], self.__x[node], self.__max_x[right])
+                or self.__max_y[node]
+                != max(self.__max_y[left], self.__y[node], self.__max_y[right])
+            ):
+                raise Exception(f"Stale bounding box at node {node}")
@@ -83,6 +83,34 @@ class Tree[K: Key, V]:
     def __repr__(self) -> str:
         return f"{self.root}" if self.root is not None else "(empty)"
 
+    def build(self, items: list[tuple[K, V]]) -> list["Leaf[K, V]"]:
+        """
+        Fills this empty tree with the given keys and values in order at
+        once, halving them recursively such that it is balanced
+        Returns the created leaves in order
+        """
+        if self.root is not None:
+            raise Exception("Build operation on a non empty tree")
+        leaves: list[Leaf[K, V]] = []
+
+        def make(
+            parent: "Branch[K, V] | Tree[K, V]", lo: int, hi: int
+        ) -> "Node[K, V]":
+            if hi - lo == 1:
+                leaf = Leaf(parent, *items[lo])
+                leaves.append(leaf)
+                return leaf
+            mid = (lo + hi) // 2
+            return Branch(
+                parent,
+                lambda branch: make(branch, lo, mid),
+                lambda branch: make(branch, mid, hi),
+            )
+
+        if len(items) != 0:
+            self.root = make(self, 0, len(items))
+        return leaves
+
     def validate(self) -> None:
         """
         Checks that the AVL tree is valid and acyclic, for debugging
@@ -291,6 +319,8 @@ class Node[K: Key, V](ABC):
     def remove(self) -> None:
         """
         Removes this leaf from this node's parent tree
+        The removed node is left without a parent, such that it does not
+        form a cycle with its former branch
         """
         if isinstance(self.parent, Tree):
             self.parent.root = None
@@ -298,6 +328,7 @@ class Node[K: Key, V](ABC):
         other = self.parent.get_other(self)
         self.parent.parent.replace(self.parent, other)
         other.parent.balance_update_propagate()
+        del self.parent
 
     def split_up(self) -> tuple[Tree[K, V], Tree[K, V]]:
         """
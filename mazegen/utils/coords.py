@@ -1,5 +1,5 @@
 from collections.abc import Generator
-from enum import Enum, auto
+from enum import Enum
 from typing import Iterable, cast, overload
 from mazegen.utils.ivec2 import IVec2
 
@@ -9,76 +9,52 @@ class Orientation(Enum):
     A simple orientation enum
     """
 
-    HORIZONTAL = auto()
-    VERTICAL = auto()
+    HORIZONTAL = 0
+    VERTICAL = 1
 
     def opposite(self) -> "Orientation":
-        if self == Orientation.HORIZONTAL:
-            return Orientation.VERTICAL
-        return Orientation.HORIZONTAL
+        return ORIENTATION_OPPOSITE[self._value_]
 
 
 class Cardinal(Enum):
     """
     A cardinal direction
+    Its value is its index in the CARDINAL_* tables, in the order of
+    Cardinal.all
     """
 
-    NORTH = auto()
-    SOUTH = auto()
-    EAST = auto()
-    WEST = auto()
+    NORTH = 0
+    SOUTH = 1
+    EAST = 2
+    WEST = 3
 
     def opposite(self) -> "Cardinal":
         """
         Gets the cardinal direction opposite of this one
         """
-        match self:
-            case Cardinal.NORTH:
-                return Cardinal.SOUTH
-            case Cardinal.SOUTH:
-                return Cardinal.NORTH
-            case Cardinal.EAST:
-                return Cardinal.WEST
-            case Cardinal.WEST:
-                return Cardinal.EAST
+        return CARDINAL_OPPOSITE[self._value_]
 
     def left(self) -> "Cardinal":
         """
         Gets the cardinal direction left of this one
         """
-        match self:
-            case Cardinal.NORTH:
-                return Cardinal.WEST
-            case Cardinal.SOUTH:
-                return Cardinal.EAST
-            case Cardinal.EAST:
-                return Cardinal.NORTH
-            case Cardinal.WEST:
-                return Cardinal.SOUTH
+        return CARDINAL_LEFT[self._value_]
 
     def right(self) -> "Cardinal":
         """
         Gets the cardinal direction right of this one
         """
-        return self.left().opposite()
+        return CARDINAL_RIGHT[self._value_]
 
     def __str__(self) -> str:
-        match self:
-            case Cardinal.NORTH:
-                return "N"
-            case Cardinal.EAST:
-                return "E"
-            case Cardinal.SOUTH:
-                return "S"
-            case Cardinal.WEST:
-                return "W"
+        return CARDINAL_NAMES[self._value_]
 
     @staticmethod
-    def all() -> list["Cardinal"]:
+    def all() -> tuple["Cardinal", ...]:
         """
-        Returns the list of all cardinal directions
+        Returns all cardinal directions, as a shared tuple
         """
-        return [Cardinal.NORTH, Cardinal.SOUTH, Cardinal.EAST, Cardinal.WEST]
+        return CARDINALS
 
     @staticmethod
     def path_to_tiles(path: list["Cardinal"], src: "CellCoord") -> list[IVec2]:
@@ -109,22 +85,49 @@ class Cardinal(Enum):
         return res
 
 
+ORIENTATION_OPPOSITE = (Orientation.VERTICAL, Orientation.HORIZONTAL)
+
+CARDINALS = (Cardinal.NORTH, Cardinal.SOUTH, Cardinal.EAST, Cardinal.WEST)
+CARDINAL_OPPOSITE = (
+    Cardinal.SOUTH,
+    Cardinal.NORTH,
+    Cardinal.WEST,
+    Cardinal.EAST,
+)
+CARDINAL_LEFT = (Cardinal.WEST, Cardinal.EAST, Cardinal.NORTH, Cardinal.SOUTH)
+CARDINAL_RIGHT = (
+    Cardinal.EAST,
+    Cardinal.WEST,
+    Cardinal.SOUTH,
+    Cardinal.NORTH,
+)
+CARDINAL_NAMES = ("N", "S", "E", "W")
+CARDINAL_OFFSETS = ((0, -1), (0, 1), (1, 0), (-1, 0))
+
+
 class WallCoord:
     """
     Wall coordinates
     a is the position in the list of lines/columns, and b is the position in
     said line/column
+    Walls are immutable, their hash being computed once, such that the same
+    instance may be shared, see Grid.wall
     """
 
+    __slots__ = ("orientation", "a", "b", "__hash")
+
     def __init__(self, orientation: Orientation, a: int, b: int) -> None:
         self.orientation: Orientation = orientation
         self.a: int = a
         self.b: int = b
+        self.__hash: int = hash((a, b, orientation))
 
     def __members(self) -> tuple[int, int, Orientation]:
         return (self.a, self.b, self.orientation)
 
     def __eq__(self, value: object, /) -> bool:
+        if self is value:
+            return True
         return (
             self.__members() == cast(WallCoord, value).__members()
             if type(self) is type(value)
@@ -132,7 +135,7 @@ class WallCoord:
         )
 
     def __hash__(self) -> int:
-        return hash(self.__members())
+        return self.__hash
 
     def a_neighbours(self) -> list["WallCoord"]:
         """
@@ -194,17 +197,19 @@ class WallCoord:
         self,
     ) -> tuple["SplitWall", "SplitWall"]:
         """
-        Returns the split wall of each side of this wall
+        Returns the split wall of each side of this wall, the cells being
+        those of neighbour_cells: the first one has the wall on its north or
+        west side, the second one on its south or east side
         """
-
-        def find_cardinal(cell: CellCoord) -> Cardinal:
-            for cardinal in Cardinal.all():
-                if cell.get_wall(cardinal) == self:
-                    return cardinal
-            raise Exception("Find cardinal on wall not on cell")
-
-        a, b = self.neighbour_cells()
-        return ((a, find_cardinal(a)), (b, find_cardinal(b)))
+        if self.orientation is Orientation.HORIZONTAL:
+            return (
+                (CellCoord(self.b, self.a), Cardinal.NORTH),
+                (CellCoord(self.b, self.a - 1), Cardinal.SOUTH),
+            )
+        return (
+            (CellCoord(self.a, self.b), Cardinal.WEST),
+            (CellCoord(self.a - 1, self.b), Cardinal.EAST),
+        )
 
 
 class CellCoord(IVec2):
@@ -212,6 +217,8 @@ class CellCoord(IVec2):
     A cell coordinate, essentially an IVec2[int] with extra methods
     """
 
+    __slots__ = ()
+
     @overload
     def __init__(self, val: IVec2, /) -> None: ...
 
@@ -248,11 +255,8 @@ class CellCoord(IVec2):
         """
         Returns the cell neighbour of this cell in the given direction
         """
-        return next(
-            filter(
-                lambda e: e != self, self.get_wall(cardinal).neighbour_cells()
-            )
-        )
+        dx, dy = CARDINAL_OFFSETS[cardinal._value_]
+        return CellCoord(self.x + dx, self.y + dy)
 
     def tile_coords(self) -> IVec2:
         """
@@ -0,0 +1,46 @@
+class DisjointSet:
+    """
+    A disjoint set forest over the integers from zero up to its size, kept
+    in flat arrays, with path compression and union by rank
+    """
+
+    def __init__(self, size: int) -> None:
+        self.__parent: list[int] = list(range(size))
+        self.__rank: bytearray = bytearray(size)
+
+    def __len__(self) -> int:
+        return len(self.__parent)
+
+    def find(self, elem: int) -> int:
+        """
+        Returns the representative of the set the element belongs to
+        """
+        parent = self.__parent
+        root = elem
+        while parent[root] != root:
+            root = parent[root]
+        while parent[elem] != root:
+            parent[elem], elem = root, parent[elem]
+        return root
+
+    def union(self, a: int, b: int) -> bool:
+        """
+        Merges the sets of both elements, returns whether they were distinct
+        """
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        rank = self.__rank
+        if rank[a] < rank[b]:
+            a, b = b, a
+        self.__parent[b] = a
+        if rank[a] == rank[b]:
+            rank[a] += 1
+        return True
+
+    def connected(self, a: int, b: int) -> bool:
+        """
+        Returns whether both elements belong to the same set
+        """
+        return self.find(a) == self.find(b)
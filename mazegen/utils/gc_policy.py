@@ -0,0 +1,120 @@
+from collections import deque
+from collections.abc import Generator
+from contextlib import contextmanager
+import gc
+import time
+
+
+class GCPolicy:
+    """
+    A garbage collection policy for realtime generation
+
+    The long lived structures, such as the maze, its trackers and the
+    display, are frozen once made, such that collections no longer walk
+    them, the thresholds of the youngest generation are raised during bulk
+    phases, and collections are run explicitly in the idle time between
+    frames, from the oldest generation which last fit in the time left
+    The time spent collecting, automatically or not, is recorded per frame
+    if record is set, through a hook in gc.callbacks, until close
+    """
+
+    def __init__(
+        self,
+        bulk_threshold: int = 10000,
+        frames: int = 4096,
+        record: bool = True,
+    ):
+        self.__bulk_threshold: int = bulk_threshold
+        self.__bulk_depth: int = 0
+        self.__thresholds: tuple[int, int, int] = gc.get_threshold()
+        self.__start: float = 0.0
+        self.__collecting: float = 0.0
+        self.__costs: list[float] = [0.0, 0.0, 0.0]
+        self.frame_times: deque[float] = deque(maxlen=frames)
+        self.__record: bool = record
+        if record:
+            gc.callbacks.append(self.__callback)
+
+    def __callback(self, phase: str, info: dict[str, int]) -> None:
+        if phase == "start":
+            self.__start = time.perf_counter()
+        else:
+            self.__collecting += time.perf_counter() - self.__start
+
+    def freeze(self) -> None:
+        """
+        Collects everything, then moves every object left to the permanent
+        generation, to be called once the long lived structures are made
+        The objects frozen by a previous call are collected along, such
+        that it may be called again once they are made anew
+        """
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+
+    @contextmanager
+    def bulk(self) -> Generator[None]:
+        """
+        A context within which the youngest generation is collected less
+        often, as a bulk phase makes many short lived objects
+        """
+        if self.__bulk_depth == 0:
+            self.__thresholds = gc.get_threshold()
+            gc.set_threshold(self.__bulk_threshold, *self.__thresholds[1:])
+        self.__bulk_depth += 1
+        try:
+            yield
+        finally:
+            self.__bulk_depth -= 1
+            if self.__bulk_depth == 0:
+                gc.set_threshold(*self.__thresholds)
+
+    def idle(self, budget: float) -> float:
+        """
+        Collects the oldest generation whose last collection took less than
+        the given time budget in seconds, returns the time it took
+        Nothing is collected if nothing was allocated since the last time
+        """
+        if gc.get_count() == (0, 0, 0):
+            return 0.0
+        for generation in (2, 1, 0):
+            if self.__costs[generation] <= budget:
+                start = time.perf_counter()
+                gc.collect(generation)
+                res = time.perf_counter() - start
+                self.__costs[generation] = res
+                return res
+        return 0.0
+
+    def end_frame(self) -> float:
+        """
+        Records the time spent collecting since the previous frame, returns
+        it
+        """
+        res = self.__collecting
+        self.__collecting = 0.0
+        self.frame_times.append(res)
+        return res
+
+    def report(self) -> str:
+        """
+        Returns a summary of the time spent collecting per frame
+        """
+        if len(self.frame_times) == 0:
+            return "GC: no frame recorded\n"
+        times = sorted(self.frame_times)
+        return (
+            f"GC: {len(times)} frames, collection time per frame: "
+            + f"mean {sum(times) / len(times) * 1000:.2f}ms, "
+            + f"p99 {times[len(times) * 99 // 100] * 1000:.2f}ms, "
+            + f"max {times[-1] * 1000:.2f}ms\n"
+        )
+
+    def close(self) -> None:
+        """
+        Stops recording, and gives the frozen objects back to the collector
+        """
+        if self.__record:
+            gc.callbacks.remove(self.__callback)
+            self.__record = False
+        gc.unfreeze()
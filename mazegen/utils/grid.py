@@ -0,0 +1,343 @@
+from array import array
+from collections import OrderedDict
+from .coords import (
+    CARDINAL_OFFSETS,
+    Cardinal,
+    CellCoord,
+    Orientation,
+    SplitWall,
+    WallCoord,
+)
+from .ivec2 import IVec2
+from weakref import WeakValueDictionary
+
+
+class Grid:
+    """
+    The integer encoding of the cells and walls of a maze of given dims
+
+    A cell id is y * width + x, a wall id is its dense index, first the
+    horizontal walls line by line, then the vertical walls row by row, as in
+    the wall storage
+    The lookup tables are built on first use, -1 standing for a cell or wall
+    out of bounds, so that hot loops may run on ints only
+
+    It also interns the coordinates of the maze lately used: the walls,
+    cells of the maze or of the ring around it, and split walls asked for
+    are kept in caches of at most CACHE_SIZE entries each, the oldest one
+    being dropped first, such that a coordinate looked up again is most
+    often not made again, while a large maze does not keep one instance of
+    each of its coordinates alive
+    As it only depends on the dims, a grid may be shared by every maze of
+    the same dims, see Grid.of
+    """
+
+    CACHE_SIZE: int = 1 << 12
+
+    def __init__(self, dims: IVec2) -> None:
+        self.dims: IVec2 = dims
+        self.width: int = dims.x
+        self.height: int = dims.y
+        self.cell_count: int = dims.x * dims.y
+        self.horizontal_count: int = (dims.y + 1) * dims.x
+        self.wall_count: int = self.horizontal_count + dims.y * (dims.x + 1)
+        self.__cell_walls: array[int] | None = None
+        self.__cell_neighbours: array[int] | None = None
+        self.__wall_cells: array[int] | None = None
+        self.__wall_neighbours: array[int] | None = None
+        self.__walls: OrderedDict[int, WallCoord] = OrderedDict()
+        self.__cells: OrderedDict[int, CellCoord] = OrderedDict()
+        self.__split_walls: OrderedDict[int, tuple[SplitWall, SplitWall]] = (
+            OrderedDict()
+        )
+        self.__wall_order: array[int] | None = None
+
+    __instances: WeakValueDictionary[tuple[int, int], "Grid"] = (
+        WeakValueDictionary()
+    )
+
+    @staticmethod
+    def of(width: int, height: int) -> "Grid":
+        """
+        Returns the grid of the given dims, shared by every caller asking for
+        the same dims as long as one of them keeps it, such that its tables
+        are only made once across the mazes alive at once
+        """
+        grid = Grid.__instances.get((width, height))
+        if grid is None:
+            grid = Grid(IVec2(width, height))
+            Grid.__instances[(width, height)] = grid
+        return grid
+
+    @staticmethod
+    def __remember[K, V](cache: OrderedDict[K, V], key: K, value: V) -> V:
+        """
+        Adds the given value to the given cache, dropping its oldest entry
+        first if it is full, and returns it
+        """
+        if len(cache) >= Grid.CACHE_SIZE:
+            cache.popitem(last=False)
+        cache[key] = value
+        return value
+
+    def cell_id(self, cell: IVec2) -> int:
+        """
+        Returns the id of the given cell, or -1 if it is out of bounds
+        """
+        if 0 <= cell.x < self.width and 0 <= cell.y < self.height:
+            return cell.y * self.width + cell.x
+        return -1
+
+    def cell(self, cell_id: int) -> CellCoord:
+        """
+        Returns the interned cell for the given id
+        """
+        y, x = divmod(cell_id, self.width)
+        return self.__ring_cell(x, y)
+
+    def __ring_cell(self, x: int, y: int) -> CellCoord:
+        """
+        Returns the interned cell at the given position, in the maze or the
+        ring around it
+        """
+        idx = (y + 1) * (self.width + 2) + x + 1
+        res = self.__cells.get(idx)
+        if res is None:
+            res = Grid.__remember(self.__cells, idx, CellCoord(x, y))
+        return res
+
+    def intern_cell(self, cell: CellCoord) -> CellCoord:
+        """
+        Returns the interned instance of the given cell, interning it if
+        there is none, or the cell itself if it lies further than the ring
+        around the maze
+        """
+        if -1 <= cell.x <= self.width and -1 <= cell.y <= self.height:
+            idx = (cell.y + 1) * (self.width + 2) + cell.x + 1
+            res = self.__cells.get(idx)
+            if res is None:
+                res = Grid.__remember(self.__cells, idx, cell)
+            return res
+        return cell
+
+    def neighbour(self, cell: CellCoord, cardinal: Cardinal) -> CellCoord:
+        """
+        Returns the interned neighbour of the given cell in the given
+        direction, as CellCoord.get_neighbour
+        """
+        dx, dy = CARDINAL_OFFSETS[cardinal._value_]
+        x = cell.x + dx
+        y = cell.y + dy
+        if -1 <= x <= self.width and -1 <= y <= self.height:
+            return self.__ring_cell(x, y)
+        return CellCoord(x, y)
+
+    def wall_id(self, wall: WallCoord) -> int:
+        """
+        Returns the id of the given wall, or -1 if it is out of bounds
+        """
+        return self.wall_id_of(
+            wall.orientation is Orientation.HORIZONTAL, wall.a, wall.b
+        )
+
+    def wall_id_of(self, horizontal: bool, a: int, b: int) -> int:
+        """
+        Returns the id of the wall of the given orientation and position, or
+        -1 if it is out of bounds
+        """
+        if horizontal:
+            if 0 <= a <= self.height and 0 <= b < self.width:
+                return a * self.width + b
+        elif 0 <= a <= self.width and 0 <= b < self.height:
+            return self.horizontal_count + b * (self.width + 1) + a
+        return -1
+
+    def wall(self, wall_id: int) -> WallCoord:
+        """
+        Returns the interned wall for the given id
+        """
+        res = self.__walls.get(wall_id)
+        if res is not None:
+            return res
+        horizontal, a, b = self.wall_position(wall_id)
+        return Grid.__remember(
+            self.__walls,
+            wall_id,
+            WallCoord(
+                Orientation.HORIZONTAL if horizontal else Orientation.VERTICAL,
+                a,
+                b,
+            ),
+        )
+
+    def wall_position(self, wall_id: int) -> tuple[bool, int, int]:
+        """
+        Returns whether the wall of the given id is horizontal, and its a and
+        b, as WallCoord, the inverse of wall_id_of
+        """
+        if wall_id < self.horizontal_count:
+            a, b = divmod(wall_id, self.width)
+            return (True, a, b)
+        b, a = divmod(wall_id - self.horizontal_count, self.width + 1)
+        return (False, a, b)
+
+    def intern_wall(self, wall: WallCoord) -> WallCoord:
+        """
+        Returns the interned instance of the given wall, interning it if
+        there is none, or the wall itself if it is out of bounds
+        """
+        wall_id = self.wall_id(wall)
+        return self.wall(wall_id) if wall_id != -1 else wall
+
+    def split_walls(self, wall_id: int) -> tuple[SplitWall, SplitWall]:
+        """
+        Returns the split wall of each side of the wall of the given id, as
+        WallCoord.to_split_wall, interned and made of interned cells
+        """
+        res = self.__split_walls.get(wall_id)
+        if res is None:
+            horizontal, a, b = self.wall_position(wall_id)
+            res = Grid.__remember(
+                self.__split_walls,
+                wall_id,
+                (
+                    (
+                        (self.__ring_cell(b, a), Cardinal.NORTH),
+                        (self.__ring_cell(b, a - 1), Cardinal.SOUTH),
+                    )
+                    if horizontal
+                    else (
+                        (self.__ring_cell(a, b), Cardinal.WEST),
+                        (self.__ring_cell(a - 1, b), Cardinal.EAST),
+                    )
+                ),
+            )
+        return res
+
+    @property
+    def cell_walls(self) -> array[int]:
+        """
+        The walls of every cell, four per cell, in the order of Cardinal.all
+        """
+        if self.__cell_walls is None:
+            res = array("i", [0]) * (4 * self.cell_count)
+            for cell in range(self.cell_count):
+                west = self.horizontal_count + cell + cell // self.width
+                res[4 * cell:4 * cell + 4] = array(
+                    "i", (cell, cell + self.width, west + 1, west)
+                )
+            self.__cell_walls = res
+        return self.__cell_walls
+
+    @property
+    def cell_neighbours(self) -> array[int]:
+        """
+        The neighbours of every cell, four per cell, in the order of
+        Cardinal.all
+        """
+        if self.__cell_neighbours is None:
+            width = self.width
+            res = array("i", [-1]) * (4 * self.cell_count)
+            for cell in range(self.cell_count):
+                y, x = divmod(cell, width)
+                if y > 0:
+                    res[4 * cell] = cell - width
+                if y + 1 < self.height:
+                    res[4 * cell + 1] = cell + width
+                if x + 1 < width:
+                    res[4 * cell + 2] = cell + 1
+                if x > 0:
+                    res[4 * cell + 3] = cell - 1
+            self.__cell_neighbours = res
+        return self.__cell_neighbours
+
+    @property
+    def wall_cells(self) -> array[int]:
+        """
+        The cells besides every wall, two per wall, in the order of
+        WallCoord.neighbour_cells
+        """
+        if self.__wall_cells is None:
+            width = self.width
+            res = array("i", [-1]) * (2 * self.wall_count)
+            for wall in range(self.horizontal_count):
+                a = wall // width
+                if a < self.height:
+                    res[2 * wall] = wall
+                if a > 0:
+                    res[2 * wall + 1] = wall - width
+            for wall in range(self.horizontal_count, self.wall_count):
+                b, a = divmod(wall - self.horizontal_count, width + 1)
+                if a < width:
+                    res[2 * wall] = b * width + a
+                if a > 0:
+                    res[2 * wall + 1] = b * width + a - 1
+            self.__wall_cells = res
+        return self.__wall_cells
+
+    @property
+    def wall_neighbours(self) -> array[int]:
+        """
+        The neighbours of every wall, six per wall, in the order of
+        WallCoord.a_neighbours then WallCoord.b_neighbours
+        """
+        if self.__wall_neighbours is None:
+            res = array("i", [-1]) * (6 * self.wall_count)
+            for wall in range(self.wall_count):
+                horizontal, a, b = self.wall_position(wall)
+                res[6 * wall:6 * wall + 6] = array(
+                    "i",
+                    (
+                        self.wall_id_of(not horizontal, b, a - 1),
+                        self.wall_id_of(horizontal, a, b - 1),
+                        self.wall_id_of(not horizontal, b, a),
+                        self.wall_id_of(not horizontal, b + 1, a - 1),
+                        self.wall_id_of(horizontal, a, b + 1),
+                        self.wall_id_of(not horizontal, b + 1, a),
+                    ),
+                )
+            self.__wall_neighbours = res
+        return self.__wall_neighbours
+
+    @property
+    def wall_order(self) -> array[int]:
+        """
+        The id of every wall, the horizontal ones line by line then the
+        vertical ones column by column, as in Grid.walls, made once
+        """
+        if self.__wall_order is None:
+            res = array("i", range(self.horizontal_count))
+            for a in range(self.width + 1):
+                res.extend(
+                    range(
+                        self.horizontal_count + a,
+                        self.wall_count,
+                        self.width + 1,
+                    )
+                )
+            self.__wall_order = res
+        return self.__wall_order
+
+    @property
+    def walls(self) -> tuple[WallCoord, ...]:
+        """
+        Every wall, in the order of wall_order, made on each access
+        """
+        return tuple(map(self.wall, self.wall_order))
+
+    @property
+    def cells(self) -> tuple[CellCoord, ...]:
+        """
+        Every cell, column by column, as CellCoord.all_up_to, made on each
+        access
+        """
+        return tuple(
+            map(
+                self.cell,
+                (
+                    y * self.width + x
+                    for x in range(self.width)
+                    for y in range(self.height)
+                ),
+            )
+        )
@@ -127,14 +127,15 @@ class Tree:
         """
         res = self.raised_to(other.__height)
 
-        def descend(node: MaybeNode, depth: int = 0) -> MaybeNode:
-            if other.__height + depth == res.__height:
-                return fn(node, other.__root)
-            (a, b, c, d) = Tree.node_split(node)
-            a = descend(a, depth + 1)
-            return Tree.node_normalize((a, b, c, d))
-
-        res.__root = descend(res.__root)
+        node = res.__root
+        siblings = []
+        for _ in range(res.__height - other.__height):
+            (node, b, c, d) = Tree.node_split(node)
+            siblings.append((b, c, d))
+        node = fn(node, other.__root)
+        for b, c, d in reversed(siblings):
+            node = Tree.node_normalize((node, b, c, d))
+        res.__root = node
         return res.normalized()
 
     def __or__(self, other: "Tree") -> "Tree":
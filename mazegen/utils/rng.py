@@ -0,0 +1,27 @@
+import random
+
+
+class ModuleRandom(random.Random):
+    """
+    A generator drawing every number from the functions of the random
+    module, such that random.seed applies to it and it yields the same
+    sequence as those functions would
+    Its own state is never drawn from, seeding it has no effect
+    """
+
+    def random(self) -> float:
+        return random.random()
+
+    def getrandbits(self, k: int) -> int:
+        return random.getrandbits(k)
+
+
+MODULE_RANDOM = ModuleRandom()
+
+
+def resolve_rng(rng: random.Random | None) -> random.Random:
+    """
+    Returns rng, or the generator drawing from the random module if it is
+    None, see ModuleRandom
+    """
+    return rng if rng is not None else MODULE_RANDOM
@@ -0,0 +1,259 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+
+from mazegen.utils.avl import BVHKey, Branch, Leaf, Node, Tree
+from mazegen.utils.coords import Cardinal, SplitWall
+from mazegen.utils.quadtree import Rect
+
+
+def contour_order(value: SplitWall) -> tuple[int, int, int]:
+    """
+    The order of SequenceForest.least: westmost cell first, then west sides
+    first, then northmost cell first
+    """
+    cell, cardinal = value
+    return (cell.x, 0 if cardinal is Cardinal.WEST else 1, cell.y)
+
+
+class SequenceForest[H, T](ABC):
+    """
+    A forest of sequences of split walls, each element being reached
+    through a handle H, and each sequence through a tree T, which may be
+    compared to tell whether two elements are in the same sequence
+    Trees are consumed by the operations which take them
+    """
+
+    @abstractmethod
+    def single(self, value: SplitWall) -> tuple[H, T]:
+        """
+        Makes a new sequence of the single given value, returns its handle
+        and tree
+        """
+
+    @abstractmethod
+    def build(self, values: list[SplitWall]) -> tuple[list[H], T]:
+        """
+        Makes a new sequence of the given values at once, returns their
+        handles in order and the tree
+        """
+
+    @abstractmethod
+    def append(self, tree: T, value: SplitWall) -> tuple[H, T]:
+        """
+        Adds the given value at the end of the tree, returns its handle and
+        the resulting tree
+        """
+
+    @abstractmethod
+    def prepend(self, tree: T, value: SplitWall) -> tuple[H, T]:
+        """
+        Adds the given value at the start of the tree, returns its handle and
+        the resulting tree
+        """
+
+    @abstractmethod
+    def join(self, lhs: T, rhs: T) -> T:
+        """
+        Concatenates two trees, returns the resulting tree
+        """
+
+    @abstractmethod
+    def split(self, handle: H) -> tuple[T, T]:
+        """
+        Removes the given element from its tree, returns the trees of the
+        elements left and right of it respectively
+        """
+
+    @abstractmethod
+    def root(self, handle: H) -> T:
+        """
+        Returns the tree the given element belongs to
+        """
+
+    @abstractmethod
+    def is_empty(self, tree: T) -> bool:
+        """
+        Returns whether the given tree is empty
+        """
+
+    @abstractmethod
+    def least(self, tree: T) -> SplitWall:
+        """
+        Returns the least value of the given non empty tree, by
+        contour_order
+        """
+
+    @abstractmethod
+    def values(self, tree: T) -> Iterator[SplitWall]:
+        """
+        Returns an iterator over the values of the given tree, in arbitrary
+        order
+        """
+
+    @abstractmethod
+    def span(self, first: H, last: H) -> tuple[Rect, SplitWall]:
+        """
+        Returns the bounding box of the cells and the least value of the
+        elements from first included to last excluded, of the same tree,
+        wrapping around its end, the whole tree if first is last
+        """
+
+
+class TreeSequenceForest(
+    SequenceForest[Leaf[BVHKey, SplitWall], Tree[BVHKey, SplitWall]]
+):
+    """
+    Sequences as linked AVL trees, see mazegen.utils.avl
+    """
+
+    def single(
+        self, value: SplitWall
+    ) -> tuple[Leaf[BVHKey, SplitWall], Tree[BVHKey, SplitWall]]:
+        tree = Tree[BVHKey, SplitWall]()
+        return (tree.append(BVHKey.for_wall(value), value), tree)
+
+    def build(
+        self, values: list[SplitWall]
+    ) -> tuple[list[Leaf[BVHKey, SplitWall]], Tree[BVHKey, SplitWall]]:
+        tree = Tree[BVHKey, SplitWall]()
+        leaves = tree.build(
+            [(BVHKey.for_wall(value), value) for value in values]
+        )
+        return (leaves, tree)
+
+    def append(
+        self, tree: Tree[BVHKey, SplitWall], value: SplitWall
+    ) -> tuple[Leaf[BVHKey, SplitWall], Tree[BVHKey, SplitWall]]:
+        return (tree.append(BVHKey.for_wall(value), value), tree)
+
+    def prepend(
+        self, tree: Tree[BVHKey, SplitWall], value: SplitWall
+    ) -> tuple[Leaf[BVHKey, SplitWall], Tree[BVHKey, SplitWall]]:
+        return (tree.prepend(BVHKey.for_wall(value), value), tree)
+
+    def join(
+        self, lhs: Tree[BVHKey, SplitWall], rhs: Tree[BVHKey, SplitWall]
+    ) -> Tree[BVHKey, SplitWall]:
+        lhs.rjoin(rhs)
+        return lhs
+
+    def split(
+        self, handle: Leaf[BVHKey, SplitWall]
+    ) -> tuple[Tree[BVHKey, SplitWall], Tree[BVHKey, SplitWall]]:
+        return handle.split_up()
+
+    def root(self, handle: Leaf[BVHKey, SplitWall]) -> Tree[BVHKey, SplitWall]:
+        return handle.root()
+
+    def is_empty(self, tree: Tree[BVHKey, SplitWall]) -> bool:
+        return tree.is_empty()
+
+    def least(self, tree: Tree[BVHKey, SplitWall]) -> SplitWall:
+        if tree.root is None:
+            raise Exception("Least operation on an empty tree")
+        return self.__least(tree.root)
+
+    def __least(self, root: Node[BVHKey, SplitWall]) -> SplitWall:
+        """
+        Returns the least value under the given node, only descending into
+        the subtrees whose bounding box reaches its west side
+        """
+        west = root.key.rect[0].x
+        res: SplitWall | None = None
+        stack: list[Node[BVHKey, SplitWall]] = [root]
+        while len(stack) != 0:
+            node = stack.pop()
+            if node.key.rect[0].x != west:
+                continue
+            if isinstance(node, Branch):
+                stack.append(node.lhs)
+                stack.append(node.rhs)
+            elif isinstance(node, Leaf) and (
+                res is None or contour_order(node.value) < contour_order(res)
+            ):
+                res = node.value
+        if res is None:
+            raise Exception("Invalid bounding boxes")
+        return res
+
+    def values(
+        self, tree: Tree[BVHKey, SplitWall]
+    ) -> Iterator[SplitWall]:
+        return iter(tree)
+
+    def span(
+        self,
+        first: Leaf[BVHKey, SplitWall],
+        last: Leaf[BVHKey, SplitWall],
+    ) -> tuple[Rect, SplitWall]:
+        nodes = self.__cover(first, last)
+        rect = nodes[0].key
+        for node in nodes[1:]:
+            rect = rect.reconcile(node.key)
+        return (rect.rect, min(map(self.__least, nodes), key=contour_order))
+
+    def __cover(
+        self,
+        first: Leaf[BVHKey, SplitWall],
+        last: Leaf[BVHKey, SplitWall],
+    ) -> list[Node[BVHKey, SplitWall]]:
+        """
+        Returns the subtrees which together make the elements from first
+        included to last excluded, wrapping around the end of their tree,
+        which is whole if they are the same
+        """
+        if first is last:
+            root = first.root().root
+            if root is None:
+                raise Exception("Invalid AVL structure")
+            return [root]
+        below: dict[int, Node[BVHKey, SplitWall]] = {}
+        curr: Node[BVHKey, SplitWall] = first
+        while isinstance(curr.parent, Branch):
+            below[id(curr.parent)] = curr
+            curr = curr.parent
+        curr = last
+        while isinstance(curr.parent, Branch) and id(curr.parent) not in below:
+            curr = curr.parent
+        common = curr.parent
+        if not isinstance(common, Branch):
+            raise Exception("Span operation across trees")
+        if common.lhs is below[id(common)]:
+            return self.__suffix(first, common) + self.__prefix(last, common)
+        return self.__suffix(first, None) + self.__prefix(last, None)
+
+    def __suffix(
+        self,
+        leaf: Leaf[BVHKey, SplitWall],
+        stop: Branch[BVHKey, SplitWall] | None,
+    ) -> list[Node[BVHKey, SplitWall]]:
+        """
+        Returns the subtrees which together make the elements from the given
+        leaf included up to the end of the left subtree of stop, or of the
+        whole tree if it is None
+        """
+        res: list[Node[BVHKey, SplitWall]] = [leaf]
+        curr: Node[BVHKey, SplitWall] = leaf
+        while isinstance(curr.parent, Branch) and curr.parent is not stop:
+            if curr.parent.lhs is curr:
+                res.append(curr.parent.rhs)
+            curr = curr.parent
+        return res
+
+    def __prefix(
+        self,
+        leaf: Leaf[BVHKey, SplitWall],
+        stop: Branch[BVHKey, SplitWall] | None,
+    ) -> list[Node[BVHKey, SplitWall]]:
+        """
+        Returns the subtrees which together make the elements from the start
+        of the right subtree of stop, or of the whole tree if it is None, up
+        to the given leaf excluded
+        """
+        res: list[Node[BVHKey, SplitWall]] = []
+        curr: Node[BVHKey, SplitWall] = leaf
+        while isinstance(curr.parent, Branch) and curr.parent is not stop:
+            if curr.parent.rhs is curr:
+                res.append(curr.parent.lhs)
+            curr = curr.parent
+        return res